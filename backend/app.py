@@ -1,19 +1,212 @@
+import functools
 import logging
-from typing import Any, Dict
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import cancellation
+import convergence
+import incumbents
+import metrics
+import multi_knapsack
 import service
-from flask import Flask, request, jsonify, abort # type: ignore
+import workers
+from flask import Flask, Response, g, request, jsonify, abort # type: ignore
 from flask_cors import CORS # type: ignore
+from werkzeug.exceptions import HTTPException # type: ignore
 
 app = Flask(__name__)
 CORS(app)
 
 logging.basicConfig(level=logging.DEBUG)
 
+# Rotas que despacham trabalho para o pool de processos. /all ocupa um worker
+# por método, então por padrão admite menos requisições simultâneas.
+limiter = workers.RouteLimiter.from_env(defaults={
+    '/calc/knapsack/all': max(1, workers.pool_size() // len(service.ALL_METHODS)),
+})
+
 @app.route('/', methods=['GET'])
 def index() -> str:
     """Health check endpoint."""
     return "<strong>Health Check:</strong> The server is running!"
 
+UNMATCHED_ROUTE = '<unmatched>'
+KNOWN_METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+@app.before_request
+def start_request_metrics() -> None:
+    """Start latency and in-flight tracking for solver routes."""
+    if not request.path.startswith('/calc/'):
+        return
+    # Unmatched paths share one label so clients can't create new series at will.
+    g.metrics_route = request.url_rule.rule if request.url_rule else UNMATCHED_ROUTE
+    g.metrics_start = time.perf_counter()
+    g.metrics_status = '500'
+    metrics.REQUESTS_IN_FLIGHT.inc(1, g.metrics_route)
+
+@app.after_request
+def record_response_status(response: Response) -> Response:
+    if 'metrics_route' in g:
+        g.metrics_status = str(response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error: Any = None) -> None:
+    """Record latency and release the in-flight slot, even on errors."""
+    if 'metrics_route' not in g:
+        return
+    route = g.pop('metrics_route')
+    metrics.REQUESTS_IN_FLIGHT.dec(1, route)
+    method = request.method if request.method in KNOWN_METHODS else 'other'
+    metrics.REQUEST_LATENCY.observe(
+        time.perf_counter() - g.metrics_start, route, method, g.metrics_status
+    )
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint() -> Response:
+    """Prometheus scrape endpoint."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+def request_deadline() -> workers.Deadline:
+    """Deadline for the current request: SOLVER_DEADLINE, or the request's
+    'deadline' field (seconds) when that is shorter."""
+    seconds = workers.default_deadline()
+    data = request.get_json(silent=True)
+    requested = data.get('deadline') if isinstance(data, dict) else None
+    if requested is not None:
+        if isinstance(requested, bool) or not isinstance(requested, (int, float)) or requested <= 0:
+            abort(400, description="'deadline' must be a positive number of seconds.")
+        seconds = min(seconds, float(requested))
+    return workers.Deadline(seconds)
+
+def client_disconnected() -> Optional[Callable[[], bool]]:
+    """waitress' check for a dropped client connection, when the server
+    provides one (see serve.py)."""
+    return request.environ.get('waitress.client_disconnected')
+
+def solver_route(view: Callable[..., Any]) -> Callable[..., Any]:
+    """Run a solver view under its route's concurrency limit and a request
+    deadline (g.deadline), answering 503 when the route is saturated.
+
+    g.cancel is the request's cancellation token. When the view returns while
+    solver calls it submitted are still running (deadline exceeded, client
+    gone, error), the token is set so they stop at their next check. The route
+    slot and the token are only given back once every call has finished.
+    """
+    @functools.wraps(view)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        route = request.url_rule.rule
+        g.deadline = request_deadline()
+        try:
+            limiter.acquire(route)
+        except workers.Busy as e:
+            logging.warning(str(e))
+            abort(503, description=str(e))
+        g.solver_futures = []
+        g.cancel = token = cancellation.acquire()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            if not all(future.done() for future in g.solver_futures):
+                token.cancel()
+            workers.when_done(g.solver_futures, lambda: cancellation.release(token))
+            limiter.release(route, g.solver_futures)
+    wrapper.is_solver_route = True # type: ignore[attr-defined]
+    return wrapper
+
+def submit_solver(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """Submit a solver call for the current request to the worker pool."""
+    future = workers.submit(fn, *args, **kwargs)
+    g.solver_futures.append(future)
+    return future
+
+def collect_solvers(futures: List[Future]) -> List[Tuple[Any, float]]:
+    """Wait for the request's solver calls within its deadline, giving up early
+    if the client disconnects. Answers 504 when the deadline passes and 499
+    when the client is gone; views let these HTTPExceptions through."""
+    try:
+        return workers.collect_all(futures, g.deadline, client_disconnected())
+    except workers.DeadlineExceeded as e:
+        logging.error(f"Deadline exceeded in {request.endpoint}: {e}")
+        abort(504, description=str(e))
+    except workers.ClientDisconnected as e:
+        logging.warning(f"Client disconnected in {request.endpoint}: {e}")
+        abort(Response(str(e), status=499))
+
+def run_solver(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a solver call on the worker pool within the request deadline."""
+    [(result, _)] = collect_solvers([submit_solver(fn, *args, **kwargs)])
+    return result
+
+def trace_capacity(data: Dict[str, Any]) -> Optional[int]:
+    """Number of trace points requested with 'trace' / 'trace_points', or None
+    when the request did not ask for a convergence trace."""
+    if not data.get('trace'):
+        return None
+    return convergence.check_capacity(data.get('trace_points', convergence.DEFAULT_CAPACITY))
+
+def multistart_options(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Multi-start settings ('restarts', 'restart_policy', 'restart_base',
+    'restart_start', 'perturbation', 'time_budget', 'parallel'), or None when
+    the request did not ask for restarts. The time budget never exceeds the
+    request deadline."""
+    if 'restarts' not in data:
+        return None
+    options = {
+        'restarts': data['restarts'],
+        'policy': data.get('restart_policy', 'luby'),
+        'base': data.get('restart_base'),
+        'start': data.get('restart_start', 'perturbed'),
+        'perturbation': data.get('perturbation', 0.1),
+        'time_budget': data.get('time_budget'),
+    }
+    service.check_multistart(**options)
+    parallel = data.get('parallel', 1)
+    if isinstance(parallel, bool) or not isinstance(parallel, int) or parallel < 1:
+        raise ValueError("'parallel' must be a positive integer.")
+    remaining = g.deadline.remaining()
+    options['time_budget'] = min(options['time_budget'] or remaining, remaining)
+    options['parallel'] = min(parallel, options['restarts'], workers.pool_size())
+    return options
+
+def run_multistart(solutions: list, current_values: list, weights: list, costs: list,
+                   max_weights: list, Tmax: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run service.multi_start on every knapsack. Each knapsack's restarts are
+    split over `parallel` pool tasks, which take consecutive stretches of the
+    restart policy's sequence and share the incumbent through an
+    incumbents.Incumbent; the best task wins."""
+    options = dict(options)
+    parallel = options.pop('parallel')
+    restarts = options.pop('restarts')
+    futures = []
+    for i in range(len(solutions)):
+        value = current_values[i] if i < len(current_values) else None
+        shared = incumbents.acquire(parallel) if parallel > 1 else None
+        tasks = []
+        first = 0
+        for c in range(parallel):
+            share = restarts // parallel + (1 if c < restarts % parallel else 0)
+            tasks.append(submit_solver(
+                service.multi_start,
+                solutions[i], value, weights[i], costs[i], max_weights[i], share,
+                Tmax=Tmax, from_start=c == 0, first=first,
+                shared=shared.task(c) if shared is not None else None, cancel=g.cancel, **options
+            ))
+            first += share
+        if shared is not None:
+            workers.when_done(tasks, functools.partial(incumbents.release, shared))
+        futures.extend(tasks)
+    results = [result for result, _ in collect_solvers(futures)]
+
+    new_solutions, new_values, runs = [], [], []
+    for i in range(len(solutions)):
+        tasks = results[i * parallel:(i + 1) * parallel]
+        best_solution, best_value, _ = min(tasks, key=lambda task: task[1])
+        new_solutions.append(best_solution)
+        new_values.append(best_value)
+        runs.append(sum(task[2] for task in tasks))
+    return {'solutions': new_solutions, 'current_values': new_values, 'restarts': runs}
+
 def get_json_data() -> Dict[str, Any]:
     """Safely get JSON data from request."""
     data = request.get_json()
@@ -22,6 +215,7 @@ def get_json_data() -> Dict[str, Any]:
     return data
 
 @app.route('/calc/simplex', methods=['POST'])
+@solver_route
 def simplex() -> Any:
     data = get_json_data()
     try:
@@ -32,7 +226,8 @@ def simplex() -> Any:
         r_eq = data.get('right_hand_equality')
         l_x = data.get('bounds', [])
 
-        result = service.simplex_method(
+        result = run_solver(
+            service.simplex_method,
             l_in=l_in,
             r_in=r_in,
             z=z,
@@ -41,6 +236,8 @@ def simplex() -> Any:
             l_x=l_x
         )
         return jsonify(result)
+    except HTTPException:
+        raise
     except KeyError as e:
         logging.error(f"Missing key: {e}")
         abort(400, description=f"Missing key: {e}")
@@ -79,12 +276,18 @@ def initial_knapsack_solution() -> Any:
         weights = data['weights']
         n = data['knapsacks_length']
         max_weights = data['maximum_weights']
+        # Relaxation seeding only applies to the GA population (see service.SEEDING_MODES).
+        if data.get('seeding', 'random') != 'random':
+            raise ValueError("'seeding' is only supported by /calc/genetic_algorithm.")
 
         solutions = service.generate_initial_solution(n, max_weights, weights)
         return jsonify({'solutions': solutions})
     except KeyError as e:
         logging.error(f"Missing key: {e}")
         abort(400, description=f"Missing key: {e}")
+    except ValueError as e:
+        logging.error(f"Invalid value: {e}")
+        abort(400, description=str(e))
     except Exception as e:
         logging.error(f"Error in initial_knapsack_solution: {e}")
         abort(500, description=str(e))
@@ -111,6 +314,7 @@ def evaluate_knapsack_solution() -> Any:
         abort(500, description=str(e))
 
 @app.route('/calc/knapsack/slope_climb', methods=['POST'])
+@solver_route
 def slope_climb_knapsack() -> Any:
     data = get_json_data()
     try:
@@ -120,21 +324,32 @@ def slope_climb_knapsack() -> Any:
         max_weights = data['maximum_weights']
         current_values = data.get('current_values', [])
 
-        solutions, current_values = service.slope_climbing(
-            solutions, current_values, weights, costs, max_weights
+        options = multistart_options(data)
+        if options:
+            return jsonify(run_multistart(solutions, current_values, weights, costs, max_weights, 1, options))
+
+        solutions, current_values = run_solver(
+            service.slope_climbing,
+            solutions, current_values, weights, costs, max_weights, cancel=g.cancel
         )
         return jsonify({
             'solutions': solutions,
             'current_values': current_values
         })
+    except HTTPException:
+        raise
     except KeyError as e:
         logging.error(f"Missing key: {e}")
         abort(400, description=f"Missing key: {e}")
+    except ValueError as e:
+        logging.error(f"Invalid value: {e}")
+        abort(400, description=str(e))
     except Exception as e:
         logging.error(f"Error in slope_climb_knapsack: {e}")
         abort(500, description=str(e))
 
 @app.route('/calc/knapsack/slope_climb_try_again', methods=['POST'])
+@solver_route
 def slope_climb_knapsack_try_again() -> Any:
     data = get_json_data()
     try:
@@ -145,21 +360,32 @@ def slope_climb_knapsack_try_again() -> Any:
         Tmax = data.get('Tmax', 10)
         current_values = data['current_values']
 
-        solutions, current_values = service.slope_climb_try_again(
-            solutions=solutions, current_values=current_values, weights=weights, costs=costs, max_weights=max_weights, Tmax=Tmax
+        options = multistart_options(data)
+        if options:
+            return jsonify(run_multistart(solutions, current_values, weights, costs, max_weights, Tmax, options))
+
+        solutions, current_values = run_solver(
+            service.slope_climb_try_again,
+            solutions=solutions, current_values=current_values, weights=weights, costs=costs, max_weights=max_weights, Tmax=Tmax, cancel=g.cancel
         )
         return jsonify({
             'solutions': solutions,
             'current_values': current_values
         })
+    except HTTPException:
+        raise
     except KeyError as e:
         logging.error(f"Missing key: {e}")
         abort(400, description=f"Missing key: {e}")
+    except ValueError as e:
+        logging.error(f"Invalid value: {e}")
+        abort(400, description=str(e))
     except Exception as e:
         logging.error(f"Error in slope_climb_knapsack_try_again: {e}")
         abort(500, description=str(e))
 
 @app.route('/calc/knapsack/tempera', methods=['POST'])
+@solver_route
 def tempera_knapsack() -> Any:
     data = get_json_data()
     try:
@@ -171,16 +397,16 @@ def tempera_knapsack() -> Any:
         ti= data.get('initial_temperature', 0.01)
         tf = data.get('final_temperature', 0.01)
         current_values = data.get('current_values', [])
-        
-        new_solutions = []
-        new_current_values = []
+        capacity = trace_capacity(data)
         
         for i in range(len(solutions)):
             if len(solutions[i]) != len(weights[i]) or len(solutions[i]) != len(costs[i]):
                 logging.error("Solution length does not match weights or costs length.")
                 abort(400, description="Solution length does not match weights or costs length.")
-                
-            new_solution, new_value = service.tempera(
+
+        futures = []
+        for i in range(len(solutions)):
+            kwargs = dict(
                 costs=costs[i],
                 weights=weights[i],
                 solution=solutions[i],
@@ -188,21 +414,53 @@ def tempera_knapsack() -> Any:
                 fr=fr,
                 tf=tf,
                 ti=ti,
-                va=current_values[i]
+                va=current_values[i],
+                cancel=g.cancel,
             )
+            if capacity:
+                futures.append(submit_solver(
+                    service.run_traced, service.tempera, convergence.TEMPERA_FIELDS, capacity, **kwargs
+                ))
+            else:
+                futures.append(submit_solver(service.tempera, **kwargs))
+
+        new_solutions = []
+        new_current_values = []
+        traces = []
+        for result, _ in collect_solvers(futures):
+            if capacity:
+                result, trace = result
+                traces.append(trace)
+            new_solution, new_value = result
             new_solutions.append(new_solution)
             new_current_values.append(new_value)
-            
-        return jsonify({'solutions': new_solutions, 'current_values': new_current_values})
+
+        response = {'solutions': new_solutions, 'current_values': new_current_values}
+        if capacity:
+            response['traces'] = traces
+        return jsonify(response)
+    except HTTPException:
+        raise
     except KeyError as e:
         logging.error(f"Missing key: {e}")
         abort(400, description=f"Missing key: {e}")
+    except ValueError as e:
+        logging.error(f"Invalid value: {e}")
+        abort(400, description=str(e))
     except Exception as e:
         logging.error(f"Error in tempera_knapsack: {e}")
         abort(500, description=str(e))
 
 @app.route('/calc/knapsack/all', methods=['POST'])
+@solver_route
 def all_methods_knapsack():
+    """Run several methods concurrently from the same frozen start state.
+
+    'methods' selects any of service.ALL_METHODS (default: the three local
+    search methods; the GA only runs when listed). The response has one
+    {'solutions', 'current_values'} entry per method, keyed by method name,
+    plus a 'timings' entry: {'methods': {name: seconds}, 'elapsed': seconds}.
+    """
     data = get_json_data()
     try:
         costs = data['costs']
@@ -215,53 +473,50 @@ def all_methods_knapsack():
         tf = data.get('final_temperature', 0.01)
         Tmax = data.get('Tmax', 10)
 
-        # Executa o método de escalada para cada solução
-        slope_climb_solutions, slope_climb_values = service.slope_climbing(
-            solutions, current_values, weights, costs, max_weights
-        )
-        slope_climb_try_solutions, slope_climb_try_values = service.slope_climb_try_again(
-            solutions, current_values, weights, costs, max_weights, Tmax
-        )
-        
-        # Executa o método tempera para cada solução
-        tempera_solutions = []
-        tempera_values = []
-        for i in range(len(solutions)):
-            tempera_solution, tempera_value = service.tempera(
-                max_weight=max_weights[i],
-                solution=solutions[i],
-                weights=weights[i],
-                costs=costs[i],
-                fr=fr,
-                tf=tf,
-                ti=ti,
-                va=current_values[i]
-            )
-            tempera_solutions.append(tempera_solution)
-            tempera_values.append(tempera_value)
+        methods = data.get('methods', list(service.DEFAULT_METHODS))
+        if not isinstance(methods, list) or not all(isinstance(m, str) for m in methods):
+            raise ValueError("'methods' must be a list of method names.")
+        params = {
+            'Tmax': Tmax,
+            'fr': fr,
+            'ti': ti,
+            'tf': tf,
+            'generations': data.get('generations', 1000),
+            'mutation_rate': data.get('mutation_rate', 0.01),
+            'population_size': data.get('population_size', 100),
+            'cross_over_rate': data.get('cross_over_rate', 0.7),
+            'keep_individuals_rate': data.get('keep_individuals', 0.1),
+        }
+        unknown = [m for m in methods if m not in service.ALL_METHODS]
+        if unknown:
+            raise ValueError(f"Unknown methods {unknown}, expected any of {service.ALL_METHODS}.")
 
-        return jsonify({
-            'slope_climbing': {
-                'solutions': slope_climb_solutions,
-                'current_values': slope_climb_values
-            },
-            'slope_climbing_try': {
-                'solutions': slope_climb_try_solutions,
-                'current_values': slope_climb_try_values
-            },
-            'temperature': {
-                'solutions': tempera_solutions,
-                'current_values': tempera_values
-            }
-        })
+        # Todos os métodos partem do mesmo estado congelado e rodam em paralelo
+        state = service.freeze_state(solutions, current_values, weights, costs, max_weights)
+        start = time.perf_counter()
+        futures = {m: submit_solver(service.run_method, m, state, params, cancel=g.cancel) for m in methods}
+
+        results: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        collected = collect_solvers(list(futures.values()))
+        for method, (result, elapsed) in zip(futures, collected):
+            results[method], timings[method] = result, elapsed
+        results['timings'] = {'methods': timings, 'elapsed': time.perf_counter() - start}
+        return jsonify(results)
+    except HTTPException:
+        raise
     except KeyError as e:
         logging.error(f"Missing key: {e}")
         abort(400, description=f"Missing key: {e}")
+    except ValueError as e:
+        logging.error(f"Invalid value: {e}")
+        abort(400, description=str(e))
     except Exception as e:
         logging.error(f"Error in all_methods_knapsack: {e}")
         abort(500, description=str(e))
 
 @app.route('/calc/knapsack/genetic_algorithm', methods=['POST'])
+@solver_route
 def genetic_algorithm_knapsack():
     data = get_json_data()
     try:
@@ -274,13 +529,16 @@ def genetic_algorithm_knapsack():
         population_size = data.get('population_size', 100)
         cross_over_rate = data.get('cross_over_rate', 0.7)
         keep_individuals_rate = data.get('keep_individuals', 0.1)
-        
-        solutions = []
+        seeding = data.get('seeding', 'random')
+        service.check_seeding(seeding, costs)
+        capacity = trace_capacity(data)
+
+        futures = []
         for i in range(len(lengths)):
             if len(costs[i]) != lengths[i] or len(weights[i]) != lengths[i]:
                 logging.error(f"Knapsack {i}: costs or weights length doesn't match declared length")
                 continue
-            initial_solution, final_solution, initial_value, final_value = service.genetic_algorithm(
+            kwargs = dict(
                 length=lengths[i],
                 max_weight=max_weights[i],
                 cost=costs[i],
@@ -290,25 +548,96 @@ def genetic_algorithm_knapsack():
                 mutation_rate=mutation_rate,
                 keep_individuals_rate=keep_individuals_rate,
                 cross_over_rate=cross_over_rate,
+                seeding=seeding,
+                cancel=g.cancel,
             )
-            solutions.append({
+            if capacity:
+                futures.append(submit_solver(
+                    service.run_traced, service.genetic_algorithm, convergence.GENETIC_FIELDS, capacity, **kwargs
+                ))
+            else:
+                futures.append(submit_solver(service.genetic_algorithm, **kwargs))
+
+        solutions = []
+        for result, _ in collect_solvers(futures):
+            trace = None
+            if capacity:
+                result, trace = result
+            initial_solution, final_solution, initial_value, final_value = result
+            solution = {
                 'initial_solution': initial_solution,
                 'final_solution': final_solution,
                 'initial_value': initial_value,
                 'final_value': final_value
-            })
-            
-        
+            }
+            if trace is not None:
+                solution['trace'] = trace
+            solutions.append(solution)
+
         return jsonify({
             'solutions': solutions,
         })
+    except HTTPException:
+        raise
     except KeyError as e:
         logging.error(f"Missing key: {e}")
         abort(400, description=f"Missing key: {e}")
+    except ValueError as e:
+        logging.error(f"Invalid value: {e}")
+        abort(400, description=str(e))
     except Exception as e:
         logging.error(f"Error in genetic_algorithm_knapsack: {e}")
         abort(500, description=str(e))
 
+@app.route('/calc/multi_knapsack', methods=['POST'])
+@solver_route
+def multi_knapsack_solver():
+    """Assign one shared set of items to several knapsacks at once.
+
+    'weights' and 'costs' describe the items, 'maximum_weights' the knapsack
+    capacities and the optional 'assignment' gives each item's knapsack index
+    (-1 for none). 'method' is 'tempera' (default) or 'local_search'.
+    """
+    data = get_json_data()
+    try:
+        weights = data['weights']
+        costs = data['costs']
+        max_weights = data['maximum_weights']
+        assignment = data.get('assignment')
+        method = data.get('method', 'tempera')
+        if method not in multi_knapsack.METHODS:
+            raise ValueError(f"Invalid method '{method}', expected one of {multi_knapsack.METHODS}.")
+        ti = data.get('initial_temperature', 100)
+        tf = data.get('final_temperature', 0.1)
+        fr = data.get('reducer_factor', 0.95)
+        moves = data.get('moves_per_temperature')
+        multi_knapsack.check_problem(weights, costs, max_weights, assignment)
+        multi_knapsack.check_schedule(ti, tf, fr, moves)
+
+        result = run_solver(
+            multi_knapsack.solve,
+            weights, costs, max_weights,
+            method=method,
+            assignment=assignment,
+            ti=ti,
+            tf=tf,
+            fr=fr,
+            moves=moves,
+            cancel=g.cancel,
+        )
+        return jsonify(result)
+    except HTTPException:
+        raise
+    except KeyError as e:
+        logging.error(f"Missing key: {e}")
+        abort(400, description=f"Missing key: {e}")
+    except ValueError as e:
+        logging.error(f"Invalid value: {e}")
+        abort(400, description=str(e))
+    except Exception as e:
+        logging.error(f"Error in multi_knapsack_solver: {e}")
+        abort(500, description=str(e))
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors."""
@@ -316,4 +645,5 @@ def not_found(error):
     return jsonify({'error': 'Not Found'}), 404
 
 if __name__ == '__main__':
+    # Servidor de desenvolvimento; em produção use `python serve.py`.
     app.run(debug=True)
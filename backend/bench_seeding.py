@@ -0,0 +1,110 @@
+import argparse
+import logging
+import random as rd
+import statistics
+import metrics
+import service
+
+# Compares the GA's initial-population modes by the number of objective
+# evaluations (metrics.SOLVER_EVALUATIONS) it takes to reach a target total
+# cost, set as a fraction of the knapsack's LP relaxation bound.
+#
+# It also starts the local-search methods from a random solution and from a
+# relaxation-seeded one and reports the objective each method optimizes
+# (cost/weight: minimized by slope climbing, maximized by tempera). This is why
+# seeding is only offered for the GA.
+#
+#   python bench_seeding.py --items 60 --target 0.9 --repeats 5
+
+GENERATION_LADDER = (0, 5, 10, 20, 40, 80)
+
+def make_problem(items, seed):
+    rng = rd.Random(seed)
+    weights = [rng.randint(5, 40) for _ in range(items)]
+    costs = [rng.randint(1, 100) for _ in range(items)]
+    max_weight = sum(weights) // 4
+    return weights, costs, max_weight
+
+def evaluations_to_target(weights, costs, max_weight, seeding, target, population_size):
+    """Run the GA with more and more generations until its best solution reaches
+    `target`. Returns (evaluations, generations, reached); when the target is
+    never reached, the counts are those of the longest run."""
+    for generations in GENERATION_LADDER:
+        before = metrics.SOLVER_EVALUATIONS.value()
+        _, _, initial_value, final_value = service.genetic_algorithm(
+            length=len(weights),
+            weight=weights,
+            cost=costs,
+            max_weight=max_weight,
+            population_size=population_size,
+            generations=generations,
+            cross_over_rate=0.7,
+            mutation_rate=0.05,
+            keep_individuals_rate=0.1,
+            seeding=seeding,
+        )
+        evaluations = metrics.SOLVER_EVALUATIONS.value() - before
+        if max(initial_value, final_value) >= target:
+            return evaluations, generations, True
+    return evaluations, generations, False
+
+def start_solution(weights, costs, max_weight, seeding):
+    if seeding == 'random':
+        return service.generate_initial_solution([len(weights)], [max_weight], [weights])[0]
+    relaxed = service.relaxation_solution(weights, costs, max_weight, seeding)
+    return service.seeded_solution(relaxed, weights, max_weight)
+
+def local_search(weights, costs, max_weight, seeding):
+    """Run slope climbing and tempera from the same start. Returns the ratios
+    (start, slope climbing, tempera) and the evaluations slope climbing used."""
+    start = start_solution(weights, costs, max_weight, seeding)
+    value = service.evaluate_solution(start, weights, costs)
+    before = metrics.SOLVER_EVALUATIONS.value()
+    _, climbed = service.slope_climbing([start[:]], [value], [weights], [costs], [max_weight])
+    evaluations = metrics.SOLVER_EVALUATIONS.value() - before
+    _, tempered = service.tempera(start[:], weights, costs, value, max_weight)
+    return value, climbed[0], tempered, evaluations
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluations-to-target for the GA seeding modes.')
+    parser.add_argument('--items', type=int, default=60)
+    parser.add_argument('--target', type=float, default=0.9, help='fraction of the LP relaxation bound')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--population-size', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    weights, costs, max_weight = make_problem(args.items, args.seed)
+    relaxed = service.relaxation_solution(weights, costs, max_weight, 'greedy')
+    bound = sum(x * c for x, c in zip(relaxed, costs))
+    target = args.target * bound
+    print(f"{args.items} items, capacity {max_weight}, LP bound {bound:.1f}, target {target:.1f}")
+    print(f"{'seeding':<8} {'reached':>8} {'median evals':>13} {'median gens':>12}")
+
+    for seeding in service.SEEDING_MODES:
+        rd.seed(args.seed)
+        runs = [
+            evaluations_to_target(weights, costs, max_weight, seeding, target, args.population_size)
+            for _ in range(args.repeats)
+        ]
+        reached = [run for run in runs if run[2]]
+        if reached:
+            evals = f"{statistics.median(e for e, _, _ in reached):.0f}"
+            gens = f"{statistics.median(g for _, g, _ in reached):.0f}"
+        else:
+            evals = f">{max(e for e, _, _ in runs):.0f}"
+            gens = f">{GENERATION_LADDER[-1]}"
+        print(f"{seeding:<8} {len(reached):>4}/{args.repeats:<3} {evals:>13} {gens:>12}")
+
+    print()
+    print("local search, median cost/weight (slope climbing: lower is better, tempera: higher is better)")
+    print(f"{'seeding':<8} {'start':>7} {'slope':>7} {'evals':>7} {'tempera':>8}")
+    for seeding in service.SEEDING_MODES:
+        rd.seed(args.seed)
+        runs = [local_search(weights, costs, max_weight, seeding) for _ in range(args.repeats)]
+        start, climbed, tempered, evals = (statistics.median(column) for column in zip(*runs))
+        print(f"{seeding:<8} {start:>7.3f} {climbed:>7.3f} {evals:>7.0f} {tempered:>8.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Optional
+
+# Measures how long the backend takes to start:
+#
+#   import    `import app` in a fresh interpreter (median of --repeats runs),
+#             and whether it pulled in scipy.
+#   cold      creating the solver pool until every worker answers, then the
+#             first LP solve, for each worker start method.
+#   respawn   SIGKILL one worker and time until the pool answers again.
+#   private   memory private to each worker (Linux only): what copy-on-write
+#             did not share with the parent.
+#
+#   python bench_startup.py --workers 2 --budget 0.5
+#
+# With --budget the script exits with status 1 when the median `import app`
+# time is over the budget or scipy is imported eagerly, so it can run as a
+# check.
+
+START_METHODS = ('fork', 'forkserver', 'spawn')
+
+# Seconds to wait for the pool to come back after a worker is killed.
+RESPAWN_TIMEOUT = 30
+
+IMPORT_PROBE = (
+    "import sys, time; t = time.perf_counter(); import app; "
+    "print(time.perf_counter() - t, 'scipy' in sys.modules)"
+)
+
+def measure_import(repeats: int) -> Dict[str, Any]:
+    times = []
+    scipy_loaded = False
+    for _ in range(repeats):
+        out = subprocess.run(
+            [sys.executable, '-c', IMPORT_PROBE], capture_output=True, text=True, check=True
+        ).stdout.split()
+        times.append(float(out[-2]))
+        scipy_loaded = scipy_loaded or out[-1] == 'True'
+    return {'median': statistics.median(times), 'max': max(times), 'scipy_loaded': scipy_loaded}
+
+def private_mb(pid: int) -> Optional[float]:
+    """Private_Clean + Private_Dirty of a process, in MB (None off Linux)."""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            kb = sum(int(line.split()[1]) for line in f if line.startswith(('Private_Clean', 'Private_Dirty')))
+    except OSError:
+        return None
+    return kb / 1024
+
+def child(method: str) -> None:
+    """Runs in a fresh interpreter with SOLVER_START_METHOD=`method`."""
+    import workers
+    result: Dict[str, Any] = {}
+
+    start = time.perf_counter()
+    workers.warm_up()
+    result['cold'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    workers.run(__import__('service').simplex_method, [[1, 1]], [1], [-1, -2], l_x=[(0, 1)] * 2)
+    result['first_lp'] = time.perf_counter() - start
+
+    pids = list(workers.get_pool()._processes)
+    private = [private_mb(pid) for pid in pids]
+    result['private'] = None if None in private else statistics.mean(private)
+
+    # A surviving worker can answer before the pool notices the kill, so the
+    # pool only counts as respawned once it is a new pool object (or, for a
+    # pool that replaces dead workers itself, runs on a new set of processes)
+    # and answers.
+    pool = workers.get_pool()
+    os.kill(pids[0], signal.SIGKILL)
+    start = time.perf_counter()
+    while time.perf_counter() - start < RESPAWN_TIMEOUT:
+        try:
+            workers.run(os.getpid)
+        except Exception:
+            time.sleep(0.001)
+            continue
+        current = workers.get_pool()
+        if current is not pool or set(current._processes) != set(pids):
+            result['respawn'] = time.perf_counter() - start
+            break
+        time.sleep(0.001)
+    else:
+        result['respawn'] = None
+    workers.shutdown()
+    print(json.dumps(result))
+
+def measure_pool(method: str, workers_count: int) -> Dict[str, Any]:
+    env = dict(os.environ, SOLVER_START_METHOD=method, SOLVER_WORKERS=str(workers_count))
+    out = subprocess.run(
+        [sys.executable, __file__, '--child', method], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def _ms(seconds: Optional[float]) -> str:
+    return f"{1000 * seconds:.0f}" if seconds is not None else '-'
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Cold start and worker respawn times of the backend.')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--methods', default=','.join(START_METHODS))
+    parser.add_argument('--budget', type=float, help='fail if `import app` takes longer than this (seconds)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    imported = measure_import(args.repeats)
+    print(f"import app: median {_ms(imported['median'])} ms, max {_ms(imported['max'])} ms, "
+          f"scipy loaded: {imported['scipy_loaded']}")
+
+    print(f"{'start method':<12} {'cold ms':>8} {'first LP ms':>12} {'respawn ms':>11} {'private MB':>11}")
+    for method in filter(None, args.methods.split(',')):
+        row = measure_pool(method, args.workers)
+        private = f"{row['private']:.1f}" if row['private'] is not None else '-'
+        print(f"{method:<12} {_ms(row['cold']):>8} {_ms(row['first_lp']):>12} {_ms(row['respawn']):>11} {private:>11}")
+
+    if args.budget is not None:
+        if imported['scipy_loaded']:
+            print("FAIL: `import app` imports scipy eagerly")
+            sys.exit(1)
+        if imported['median'] > args.budget:
+            print(f"FAIL: `import app` took {_ms(imported['median'])} ms, budget {_ms(args.budget)} ms")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
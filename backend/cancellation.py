@@ -0,0 +1,83 @@
+import logging
+import multiprocessing as mp
+import threading
+from typing import List, Optional
+
+# Cancelamento cooperativo dos solvers.
+#
+# Cada requisição recebe um Token, que é só o índice de uma posição num array
+# de flags em memória compartilhada. O array é criado no processo principal e
+# entregue aos workers do pool no initializer, então marcar o token no processo
+# principal (prazo estourado, cliente desconectado) é visto pelo solver que
+# está rodando no worker, que verifica o token a cada CHECK_EVERY iterações e
+# levanta Cancelled.
+
+SLOTS = 1024
+CHECK_EVERY = 64
+
+_flags = None
+_free: List[int] = []
+_lock = threading.Lock()
+
+
+class Cancelled(Exception):
+    """Levantada dentro de um solver quando a requisição dele foi cancelada."""
+
+
+class Token:
+    """Sinal de cancelamento de uma requisição; pode ser enviado aos workers."""
+
+    __slots__ = ('slot',)
+
+    def __init__(self, slot: Optional[int]):
+        self.slot = slot
+
+    def cancel(self) -> None:
+        if self.slot is not None and _flags is not None:
+            _flags[self.slot] = 1
+
+    def cancelled(self) -> bool:
+        return self.slot is not None and _flags is not None and bool(_flags[self.slot])
+
+def shared_flags():
+    """Array de flags compartilhado, criado no primeiro uso (processo principal)."""
+    global _flags
+    with _lock:
+        if _flags is None:
+            _flags = mp.RawArray('b', SLOTS)
+            _free[:] = range(SLOTS - 1, -1, -1)
+    return _flags
+
+def install(flags) -> None:
+    """Instala no worker o array criado por shared_flags() no processo principal."""
+    global _flags
+    _flags = flags
+
+def acquire() -> Token:
+    """Reserva um token livre. Sem posições livres, devolve um token que nunca é cancelado."""
+    shared_flags()
+    with _lock:
+        slot = _free.pop() if _free else None
+    if slot is None:
+        logging.warning("No free cancellation slots; this request cannot be cancelled.")
+        return Token(None)
+    _flags[slot] = 0
+    return Token(slot)
+
+def release(token: Token) -> None:
+    """Devolve a posição do token; só quando nenhum solver ainda o observa."""
+    if token.slot is None:
+        return
+    with _lock:
+        _free.append(token.slot)
+
+def check(token: Optional[Token], step: int = 0) -> None:
+    """
+    Levanta Cancelled se o token foi cancelado; só consulta o token quando
+    `step` é múltiplo de CHECK_EVERY.
+
+    :param token: Token da requisição (None: nunca cancela).
+    :param step: Iteração atual do laço que faz a verificação.
+    """
+    if token is not None and step % CHECK_EVERY == 0 and token.cancelled():
+        raise Cancelled("Solver run cancelled.")
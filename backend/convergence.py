@@ -0,0 +1,103 @@
+import numpy as np # type: ignore
+
+# Rastro de convergência de tamanho fixo para os solvers.
+#
+# Guarda até `capacity` amostras em arrays float32 pré-alocados. A cada
+# `stride` passos do solver uma amostra é gravada; quando o buffer enche, as
+# amostras são dizimadas (fica uma a cada duas) e o passo dobra. Assim o custo
+# em memória é O(capacity) qualquer que seja o número de iterações, e o custo
+# por iteração é uma comparação quando o passo não é amostrado.
+
+DEFAULT_CAPACITY = 256
+MAX_CAPACITY = 4096
+
+TEMPERA_FIELDS = ('best', 'current', 'temperature', 'acceptance_rate')
+GENETIC_FIELDS = ('best', 'current', 'diversity')
+
+class Trace:
+    """Buffer de amostras por iteração com dizimação automática."""
+
+    def __init__(self, fields, capacity=DEFAULT_CAPACITY):
+        """
+        :param fields: Nomes das séries gravadas em cada amostra.
+        :param capacity: Número máximo de amostras guardadas (par, >= 2).
+        """
+        if capacity < 2 or capacity % 2:
+            raise ValueError("Trace capacity must be an even number >= 2.")
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.stride = 1
+        self.size = 0
+        self.steps = np.zeros(capacity, np.int64)
+        self.values = np.zeros((len(self.fields), capacity), np.float32)
+
+    def due(self, step):
+        """Indica se o passo `step` deve ser gravado."""
+        return step % self.stride == 0
+
+    def record(self, step, *values):
+        """
+        Grava uma amostra; só deve ser chamado quando due(step) é verdadeiro.
+
+        :param step: Número da iteração/geração.
+        :param values: Um valor para cada campo, na ordem de `fields`.
+        """
+        if self.size == self.capacity:
+            half = self.capacity // 2
+            self.steps[:half] = self.steps[::2]
+            self.values[:, :half] = self.values[:, ::2]
+            self.size = half
+            self.stride *= 2
+            if step % self.stride:
+                return
+        self.steps[self.size] = step
+        self.values[:, self.size] = values
+        self.size += 1
+
+    def finish(self, step, *values):
+        """
+        Grava o estado final do solver, mesmo fora do passo de amostragem.
+
+        :param step: Número de iterações executadas.
+        :param values: Um valor para cada campo, na ordem de `fields`.
+        """
+        if self.size and self.steps[self.size - 1] == step:
+            return
+        if self.size == self.capacity:
+            self.size -= 1
+        self.steps[self.size] = step
+        self.values[:, self.size] = values
+        self.size += 1
+
+    def to_dict(self):
+        """Representação compacta para a resposta JSON."""
+        return {
+            'stride': self.stride,
+            'step': self.steps[:self.size].tolist(),
+            **{
+                name: [float(f'{v:.6g}') for v in self.values[i, :self.size].tolist()]
+                for i, name in enumerate(self.fields)
+            },
+        }
+
+def check_capacity(capacity):
+    """
+    Valida o número de pontos pedido para um rastro.
+
+    :param capacity: Valor vindo da requisição.
+    :return: A capacidade como int.
+    """
+    if isinstance(capacity, bool) or not isinstance(capacity, int) or not 2 <= capacity <= MAX_CAPACITY or capacity % 2:
+        raise ValueError(f"'trace_points' must be an even integer between 2 and {MAX_CAPACITY}.")
+    return capacity
+
+def population_diversity(pop):
+    """
+    Diversidade de uma população binária: média, por gene, de 4·p·(1-p), onde p
+    é a fração de indivíduos com o gene ligado. Vale 0 para uma população de
+    clones e 1 quando cada gene está ligado em metade dos indivíduos.
+
+    :param pop: Matriz (indivíduos x genes) de 0s e 1s.
+    """
+    p = np.asarray(pop).mean(axis=0)
+    return float(np.mean(4 * p * (1 - p))) if p.size else 0.0
@@ -0,0 +1,78 @@
+import logging
+import math
+import multiprocessing as mp
+import threading
+from typing import List, Optional, Sequence
+
+# Incumbente compartilhado entre as tarefas paralelas da subida de encosta com
+# reinícios (uma mochila dividida em várias tarefas do pool).
+#
+# Como em cancellation, o array de valores é criado no processo principal e
+# entregue aos workers no initializer. Cada tarefa recebe uma posição própria,
+# onde só ela escreve o seu melhor valor; o incumbente do grupo é o menor valor
+# entre as posições do grupo. Com um único escritor por posição as tarefas não
+# disputam a escrita e nenhum lock entre processos é necessário.
+
+SLOTS = 1024
+
+_values = None
+_free: List[int] = []
+_lock = threading.Lock()
+
+
+class Incumbent:
+    """Posições de um grupo de tarefas; pode ser enviado aos workers."""
+
+    __slots__ = ('slots', 'own')
+
+    def __init__(self, slots: Sequence[int], own: Optional[int] = None):
+        self.slots = tuple(slots)
+        self.own = own
+
+    def task(self, index: int) -> 'Incumbent':
+        """Visão do grupo para a tarefa `index`, que escreve na sua posição."""
+        return Incumbent(self.slots, self.slots[index] if index < len(self.slots) else None)
+
+    def value(self) -> float:
+        """Menor valor publicado pelo grupo (math.inf se nenhum)."""
+        if _values is None:
+            return math.inf
+        return min((_values[slot] for slot in self.slots), default=math.inf)
+
+    def offer(self, value: float) -> None:
+        """Publica `value` se for melhor (menor) que o já publicado por esta tarefa."""
+        if self.own is not None and _values is not None and value < _values[self.own]:
+            _values[self.own] = value
+
+def shared_values():
+    """Array de valores compartilhado, criado no primeiro uso (processo principal)."""
+    global _values
+    with _lock:
+        if _values is None:
+            _values = mp.RawArray('d', SLOTS)
+            _free[:] = range(SLOTS - 1, -1, -1)
+    return _values
+
+def install(values) -> None:
+    """Instala no worker o array criado por shared_values() no processo principal."""
+    global _values
+    _values = values
+
+def acquire(tasks: int) -> Incumbent:
+    """
+    Reserva uma posição para cada uma de `tasks` tarefas. Sem posições livres
+    suficientes, devolve um grupo vazio: cada tarefa fica só com o seu incumbente.
+    """
+    shared_values()
+    with _lock:
+        slots = [_free.pop() for _ in range(tasks)] if len(_free) >= tasks else []
+    if not slots:
+        logging.warning("No free incumbent slots; parallel restarts will not share their best value.")
+    for slot in slots:
+        _values[slot] = math.inf
+    return Incumbent(slots)
+
+def release(incumbent: Incumbent) -> None:
+    """Devolve as posições do grupo; só quando nenhuma tarefa ainda as usa."""
+    with _lock:
+        _free.extend(incumbent.slots)
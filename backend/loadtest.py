@@ -0,0 +1,245 @@
+import argparse
+import json
+import logging
+import math
+import os
+import queue
+import random as rd
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import service
+
+# Local load generator for the API. Replays a weighted mix of solver requests
+# at a target rate and concurrency, either in-process through the Flask test
+# client or against a running server, and reports throughput, latency
+# percentiles and error rates per route.
+#
+#   python loadtest.py --mix slope_climb=3,tempera=3,simplex=2,all=1 --rate 20 --concurrency 8 --duration 30
+#   python loadtest.py --url http://127.0.0.1:5000 --compare loadtest_results/previous.json
+#
+# Latency is measured from the time a request was *scheduled*, not sent, so a
+# saturated server shows up as queueing delay instead of a lower request rate.
+
+ROUTES = {
+    'simplex': '/calc/simplex',
+    'slope_climb': '/calc/knapsack/slope_climb',
+    'slope_climb_try_again': '/calc/knapsack/slope_climb_try_again',
+    'tempera': '/calc/knapsack/tempera',
+    'all': '/calc/knapsack/all',
+    'genetic_algorithm': '/calc/knapsack/genetic_algorithm',
+    'multi_knapsack': '/calc/multi_knapsack',
+}
+
+DEFAULT_MIX = 'simplex=2,slope_climb=3,tempera=3,all=1,genetic_algorithm=1'
+
+Sender = Callable[[str, Dict[str, Any]], int]
+
+# PAYLOADS ---------------------------------------------------------------------------
+def build_payloads(knapsacks: int, items: int, generations: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    """Build one request body per route from a random knapsack problem."""
+    rd.seed(seed)
+    lengths = [items] * knapsacks
+    weights, costs = service.generate_knapsack_problem(lengths, 1, 20)
+    max_weights = [sum(w) // 3 for w in weights]
+    solutions = service.generate_initial_solution(lengths, max_weights, weights)
+    current_values = [
+        service.evaluate_solution(solutions[k], weights[k], costs[k]) for k in range(knapsacks)
+    ]
+    knapsack = {
+        'costs': costs,
+        'weights': weights,
+        'solutions': solutions,
+        'maximum_weights': max_weights,
+        'current_values': current_values,
+    }
+    temperature = {'initial_temperature': 100, 'final_temperature': 0.1, 'reducer_factor': 0.95}
+    return {
+        'simplex': {
+            'objective': [-c for c in costs[0]],
+            'coefficient_inequality': [weights[0]],
+            'right_hand_inequality': [max_weights[0]],
+            'bounds': [[0, 1]] * items,
+        },
+        'slope_climb': knapsack,
+        'slope_climb_try_again': {**knapsack, 'Tmax': 10},
+        'tempera': {**knapsack, **temperature},
+        'all': {**knapsack, **temperature, 'Tmax': 10},
+        'genetic_algorithm': {
+            'costs': costs,
+            'weights': weights,
+            'lengths': lengths,
+            'maximum_weights': max_weights,
+            'generations': generations,
+            'population_size': 20,
+        },
+        'multi_knapsack': {
+            'weights': [w for knapsack_weights in weights for w in knapsack_weights],
+            'costs': [c for knapsack_costs in costs for c in knapsack_costs],
+            'maximum_weights': max_weights,
+        },
+    }
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """Parse "route=weight,..." into a list of (route, weight)."""
+    mix = []
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, weight = item.partition('=')
+        if name not in ROUTES:
+            raise ValueError(f"Unknown route '{name}', expected one of {list(ROUTES)}.")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+# SENDERS ----------------------------------------------------------------------------
+def http_sender(base_url: str, timeout: float) -> Sender:
+    def send(path: str, body: Dict[str, Any]) -> int:
+        request = urllib.request.Request(
+            base_url.rstrip('/') + path,
+            data=json.dumps(body).encode(),
+            headers={'Content-Type': 'application/json'},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+    return send
+
+def test_client_sender() -> Sender:
+    from app import app
+    local = threading.local()
+
+    def send(path: str, body: Dict[str, Any]) -> int:
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        return client.post(path, json=body).status_code
+    return send
+
+# RUNNER -----------------------------------------------------------------------------
+def run(send: Sender, mix: List[Tuple[str, float]], payloads: Dict[str, Dict[str, Any]],
+        rate: float, concurrency: int, duration: float) -> Dict[str, List[Tuple[float, int]]]:
+    """Issue requests at `rate` per second for `duration` seconds using
+    `concurrency` threads. Returns {route: [(latency, status), ...]}; status 0
+    means the request failed without an HTTP response."""
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    schedule: 'queue.Queue[Optional[Tuple[str, float]]]' = queue.Queue()
+    samples: Dict[str, List[Tuple[float, int]]] = {name: [] for name in names}
+    lock = threading.Lock()
+
+    def worker() -> None:
+        while True:
+            job = schedule.get()
+            if job is None:
+                return
+            name, scheduled = job
+            try:
+                status = send(ROUTES[name], payloads[name])
+            except Exception as e:
+                logging.debug(f"{name} failed: {e}")
+                status = 0
+            latency = time.perf_counter() - scheduled
+            with lock:
+                samples[name].append((latency, status))
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+
+    start = time.perf_counter()
+    total = int(rate * duration)
+    for i in range(total):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        schedule.put((rd.choices(names, weights)[0], scheduled))
+    for _ in threads:
+        schedule.put(None)
+    for thread in threads:
+        thread.join()
+    return samples
+
+# REPORT -----------------------------------------------------------------------------
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list (None if empty)."""
+    if not values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return values[rank - 1]
+
+def summarize(samples: Dict[str, List[Tuple[float, int]]], wall: float) -> Dict[str, Dict[str, Any]]:
+    summary = {}
+    for name, results in samples.items():
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, status in results if not 200 <= status < 300)
+        summary[name] = {
+            'requests': len(results),
+            'errors': errors,
+            'error_rate': errors / len(results) if results else 0.0,
+            'throughput': len(results) / wall if wall > 0 else 0.0,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+        }
+    return summary
+
+def _ms(seconds: Optional[float]) -> str:
+    return f"{1000 * seconds:.1f}" if seconds is not None else '-'
+
+def print_summary(summary: Dict[str, Dict[str, Any]], previous: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+    print(f"{'route':<22} {'reqs':>6} {'err%':>6} {'rps':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in summary.items():
+        line = (
+            f"{name:<22} {row['requests']:>6} {100 * row['error_rate']:>6.1f} {row['throughput']:>7.2f}"
+            f" {_ms(row['p50']):>9} {_ms(row['p95']):>9} {_ms(row['p99']):>9}"
+        )
+        old = (previous or {}).get(name)
+        if row['p99'] and old and old.get('p99'):
+            line += f"   p99 {100 * (row['p99'] / old['p99'] - 1):+.0f}% vs previous"
+        print(line)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Drive the API with concurrent synthetic traffic.')
+    parser.add_argument('--url', help='base URL of a running server; default: in-process Flask test client')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'weighted route mix (routes: {", ".join(ROUTES)})')
+    parser.add_argument('--rate', type=float, default=10, help='target requests per second')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20, help='seconds of traffic')
+    parser.add_argument('--knapsacks', type=int, default=2)
+    parser.add_argument('--items', type=int, default=20)
+    parser.add_argument('--generations', type=int, default=20, help='GA generations per request')
+    parser.add_argument('--timeout', type=float, default=120, help='HTTP timeout per request')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='JSON file for the results (default: loadtest_results/<timestamp>.json)')
+    parser.add_argument('--compare', help='previous results JSON to compare p99 against')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    mix = parse_mix(args.mix)
+    payloads = build_payloads(args.knapsacks, args.items, args.generations, args.seed)
+    send = http_sender(args.url, args.timeout) if args.url else test_client_sender()
+
+    start = time.perf_counter()
+    samples = run(send, mix, payloads, args.rate, args.concurrency, args.duration)
+    wall = time.perf_counter() - start
+    summary = summarize(samples, wall)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)['summary']
+    print_summary(summary, previous)
+
+    output = args.output or os.path.join('loadtest_results', time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'config': vars(args), 'wall_seconds': wall, 'summary': summary}, f, indent=2)
+    print(f"Results saved to {output}")
+
+if __name__ == '__main__':
+    main()
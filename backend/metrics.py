@@ -0,0 +1,248 @@
+import threading
+import weakref
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Métricas em formato texto do Prometheus, sem dependência externa.
+#
+# Cada thread escreve na sua própria célula (lista) e a coleta apenas soma as
+# células de todas as threads, então incrementar um contador nunca toma lock.
+# O lock só é usado na primeira escrita de cada thread, para registrar a célula,
+# e quando a thread termina, para somar a célula dela ao total das encerradas.
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+# PRIMITIVES -------------------------------------------------------------------------
+class _Metric:
+    """Base de uma métrica com células por thread, indexadas por rótulos."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), size: int = 1):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cells: Dict[int, Dict[LabelValues, List[float]]] = {}
+        # Valores das threads que já terminaram.
+        self._retired: Dict[LabelValues, List[float]] = {}
+
+    def _cell(self, values: LabelValues) -> List[float]:
+        cells = getattr(self._local, 'cells', None)
+        if cells is None:
+            cells = self._local.cells = {}
+            key = id(cells)
+            with self._lock:
+                self._cells[key] = cells
+            # O objeto Thread só é coletado depois que a thread termina, então
+            # ninguém mais escreve nessas células quando _retire roda.
+            weakref.finalize(threading.current_thread(), self._retire, key)
+        cell = cells.get(values)
+        if cell is None:
+            cell = cells[values] = [0.0] * self._size
+        return cell
+
+    def _retire(self, key: int) -> None:
+        with self._lock:
+            cells = self._cells.pop(key, None)
+            if cells:
+                self._add(self._retired, cells)
+
+    def _add(self, totals: Dict[LabelValues, List[float]], cells: Dict[LabelValues, List[float]]) -> None:
+        for values, cell in list(cells.items()):
+            total = totals.setdefault(values, [0.0] * self._size)
+            for i, v in enumerate(cell):
+                total[i] += v
+
+    def _collect(self) -> Dict[LabelValues, List[float]]:
+        totals: Dict[LabelValues, List[float]] = {}
+        with self._lock:
+            shards = list(self._cells.values())
+            self._add(totals, self._retired)
+        for shard in shards:
+            self._add(totals, shard)
+        return totals
+
+    def _header(self) -> List[str]:
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+
+    def _label_str(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labels, values))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        body = ','.join(f'{k}="{_escape(v)}"' for k, v in pairs)
+        return '{' + body + '}'
+
+
+class Counter(_Metric):
+    """Contador monotônico."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        self._cell(labels)[0] += amount
+
+    def value(self, *labels: str) -> float:
+        return self._collect().get(labels, [0.0])[0]
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for values, cell in sorted(self._collect().items()):
+            lines.append(f'{self.name}{self._label_str(values)} {_fmt(cell[0])}')
+        return lines
+
+
+class Gauge(Counter):
+    """Valor que sobe e desce, como o número de requisições em andamento."""
+
+    kind = 'gauge'
+
+    def dec(self, amount: float = 1, *labels: str) -> None:
+        self._cell(labels)[0] -= amount
+
+
+class Histogram(_Metric):
+    """Histograma cumulativo com buckets fixos, mais soma e contagem."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # Uma posição por bucket, mais +Inf, soma e contagem.
+        super().__init__(name, documentation, labels, size=len(self.buckets) + 3)
+
+    def observe(self, amount: float, *labels: str) -> None:
+        cell = self._cell(labels)
+        i = 0
+        for bound in self.buckets:
+            if amount <= bound:
+                break
+            i += 1
+        cell[i] += 1
+        cell[-2] += amount
+        cell[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        n = len(self.buckets)
+        for values, cell in sorted(self._collect().items()):
+            cumulative = 0.0
+            for bound, hits in zip(self.buckets, cell[:n]):
+                cumulative += hits
+                lines.append(f'{self.name}_bucket{self._label_str(values, ("le", _fmt(bound)))} {_fmt(cumulative)}')
+            cumulative += cell[n]
+            lines.append(f'{self.name}_bucket{self._label_str(values, ("le", "+Inf"))} {_fmt(cumulative)}')
+            lines.append(f'{self.name}_sum{self._label_str(values)} {_fmt(cell[-2])}')
+            lines.append(f'{self.name}_count{self._label_str(values)} {_fmt(cell[-1])}')
+        return lines
+
+# HELPERS ----------------------------------------------------------------------------
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _fmt(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+# REGISTRY ---------------------------------------------------------------------------
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Latência das requisições HTTP por rota.',
+    labels=('route', 'method', 'status'),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'http_requests_in_flight',
+    'Requisições HTTP em andamento por rota.',
+    labels=('route',),
+)
+SOLVER_EVALUATIONS = Counter(
+    'solver_evaluations_total',
+    'Avaliações da função objetivo feitas pelos solvers.',
+)
+SOLVER_GENERATIONS = Counter(
+    'solver_generations_total',
+    'Gerações executadas pelo algoritmo genético.',
+)
+SOLVER_TEMPERATURE_STEPS = Counter(
+    'solver_temperature_steps_total',
+    'Passos de resfriamento executados pela têmpera simulada.',
+)
+SOLVER_RESTARTS = Counter(
+    'solver_restarts_total',
+    'Novas tentativas sem melhora na subida de encosta com tentativas.',
+)
+SOLVER_MULTISTARTS = Counter(
+    'solver_multistarts_total',
+    'Reinícios executados pela subida de encosta com reinícios.',
+)
+LP_SOLVE_SECONDS = Histogram(
+    'lp_solve_duration_seconds',
+    'Tempo gasto pelo linprog em simplex_method.',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+REGISTRY: Tuple[_Metric, ...] = (
+    REQUEST_LATENCY,
+    REQUESTS_IN_FLIGHT,
+    SOLVER_EVALUATIONS,
+    SOLVER_GENERATIONS,
+    SOLVER_TEMPERATURE_STEPS,
+    SOLVER_RESTARTS,
+    SOLVER_MULTISTARTS,
+    LP_SOLVE_SECONDS,
+)
+
+# Métricas incrementadas pelos solvers; quando eles rodam em outro processo, o
+# delta é devolvido junto com o resultado e somado aqui com merge().
+SOLVER_METRICS: Tuple[_Metric, ...] = (
+    SOLVER_EVALUATIONS,
+    SOLVER_GENERATIONS,
+    SOLVER_TEMPERATURE_STEPS,
+    SOLVER_RESTARTS,
+    SOLVER_MULTISTARTS,
+    LP_SOLVE_SECONDS,
+)
+
+Snapshot = Dict[str, Dict[LabelValues, List[float]]]
+
+def snapshot() -> Snapshot:
+    """Valores atuais das métricas dos solvers neste processo."""
+    return {metric.name: metric._collect() for metric in SOLVER_METRICS}
+
+def diff(before: Snapshot) -> Snapshot:
+    """Quanto as métricas dos solvers andaram desde `before`."""
+    delta: Snapshot = {}
+    for name, series in snapshot().items():
+        previous = before.get(name, {})
+        for values, cell in series.items():
+            old = previous.get(values)
+            changed = cell if old is None else [a - b for a, b in zip(cell, old)]
+            if any(changed):
+                delta.setdefault(name, {})[values] = changed
+    return delta
+
+def merge(delta: Snapshot) -> None:
+    """Soma um delta vindo de outro processo às métricas deste processo."""
+    for metric in SOLVER_METRICS:
+        for values, changed in delta.get(metric.name, {}).items():
+            cell = metric._cell(values)
+            for i, v in enumerate(changed):
+                cell[i] += v
+
+def render() -> str:
+    """Gera o texto de exposição de todas as métricas registradas."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,314 @@
+import math
+import random as rd
+import logging as log
+import cancellation
+import metrics
+
+# Mochila múltipla com itens compartilhados.
+#
+# Um único conjunto de itens é distribuído entre mochilas de capacidades
+# diferentes: cada item vai para no máximo uma mochila. A solução é um vetor de
+# atribuição item -> mochila (UNASSIGNED para itens fora de todas) e a carga de
+# cada mochila é mantida num vetor à parte, então avaliar ou aplicar um
+# movimento de deslocamento (shift) ou troca (swap) custa O(1).
+
+UNASSIGNED = -1
+METHODS = ('tempera', 'local_search')
+
+# PROBLEM ----------------------------------------------------------------------------
+def check_problem(weights, costs, max_weights, assignment=None):
+    """
+    Valida um problema de mochila múltipla com itens compartilhados.
+
+    :param weights: Lista de pesos dos itens.
+    :param costs: Lista de custos dos itens.
+    :param max_weights: Lista de capacidades de cada mochila.
+    :param assignment: Atribuição inicial (opcional).
+    :raises ValueError: Se o problema ou a atribuição forem inválidos.
+    """
+    if not weights:
+        raise ValueError("'weights' must list at least one item.")
+    if len(weights) != len(costs):
+        raise ValueError("'weights' and 'costs' must have the same length.")
+    if not max_weights:
+        raise ValueError("'maximum_weights' must list at least one knapsack.")
+    if not all(_is_number(v) for v in (*weights, *costs, *max_weights)):
+        raise ValueError("Weights, costs and capacities must be numbers.")
+    if any(w <= 0 for w in weights) or any(c < 0 for c in max_weights):
+        raise ValueError("Item weights must be positive and capacities non-negative.")
+    if assignment is None:
+        return
+    if len(assignment) != len(weights):
+        raise ValueError("'assignment' must have one entry per item.")
+    loads = [0] * len(max_weights)
+    for j, k in enumerate(assignment):
+        if isinstance(k, bool) or not isinstance(k, int) or not UNASSIGNED <= k < len(max_weights):
+            raise ValueError(f"'assignment' entries must be -1 or a knapsack index below {len(max_weights)}.")
+        if k != UNASSIGNED:
+            loads[k] += weights[j]
+    for k, load in enumerate(loads):
+        if load > max_weights[k]:
+            raise ValueError(f"Initial assignment overloads knapsack {k}: {load} > {max_weights[k]}.")
+# ------------------------------------------------------------------------------------
+def _is_number(value):
+    return not isinstance(value, bool) and isinstance(value, (int, float))
+# ------------------------------------------------------------------------------------
+def greedy_assignment(weights, costs, max_weights):
+    """
+    Atribuição inicial gulosa: itens em ordem decrescente de custo/peso, cada um
+    na mochila com mais capacidade livre que ainda o comporta.
+
+    :return: Lista com a mochila de cada item (UNASSIGNED se não couber).
+    """
+    free = list(max_weights)
+    assignment = [UNASSIGNED] * len(weights)
+    for j in sorted(range(len(weights)), key=lambda j: costs[j] / weights[j], reverse=True):
+        k = max(range(len(free)), key=free.__getitem__)
+        if weights[j] <= free[k]:
+            assignment[j] = k
+            free[k] -= weights[j]
+    return assignment
+
+
+class Assignment:
+    """Atribuição item -> mochila com as cargas e o valor total mantidos em O(1)."""
+
+    def __init__(self, weights, costs, max_weights, assignment):
+        self.weights = weights
+        self.costs = costs
+        self.max_weights = max_weights
+        self.items = list(assignment)
+        self.loads = [0] * len(max_weights)
+        self.value = 0
+        for j, k in enumerate(self.items):
+            if k != UNASSIGNED:
+                self.loads[k] += weights[j]
+                self.value += costs[j]
+
+    def fits(self, k, extra):
+        """Se a mochila `k` comporta mais `extra` de peso (fora das mochilas sempre cabe)."""
+        return k == UNASSIGNED or self.loads[k] + extra <= self.max_weights[k]
+
+    def shift_delta(self, j, k):
+        """
+        Variação do valor ao mover o item `j` para a mochila `k`.
+
+        :return: A variação, ou None se o movimento é inviável ou nulo.
+        """
+        source = self.items[j]
+        if source == k or not self.fits(k, self.weights[j]):
+            return None
+        if source == UNASSIGNED:
+            return self.costs[j]
+        if k == UNASSIGNED:
+            return -self.costs[j]
+        return 0
+
+    def shift(self, j, k):
+        """Move o item `j` para a mochila `k` (sem verificar a capacidade)."""
+        source = self.items[j]
+        if source != UNASSIGNED:
+            self.loads[source] -= self.weights[j]
+            self.value -= self.costs[j]
+        if k != UNASSIGNED:
+            self.loads[k] += self.weights[j]
+            self.value += self.costs[j]
+        self.items[j] = k
+
+    def swap_delta(self, i, j):
+        """
+        Variação do valor ao trocar as mochilas dos itens `i` e `j`.
+
+        :return: A variação, ou None se a troca é inviável ou nula.
+        """
+        a, b = self.items[i], self.items[j]
+        if a == b:
+            return None
+        difference = self.weights[j] - self.weights[i]
+        if not self.fits(a, difference) or not self.fits(b, -difference):
+            return None
+        if a == UNASSIGNED:
+            return self.costs[i] - self.costs[j]
+        if b == UNASSIGNED:
+            return self.costs[j] - self.costs[i]
+        return 0
+
+    def swap(self, i, j):
+        """Troca as mochilas dos itens `i` e `j` (sem verificar a capacidade)."""
+        a, b = self.items[i], self.items[j]
+        self.shift(i, b)
+        self.shift(j, a)
+
+# LOCAL SEARCH -----------------------------------------------------------------------
+def local_search(state, cancel=None):
+    """
+    Busca local de primeira melhora na vizinhança de deslocamentos e trocas.
+
+    Aceita qualquer movimento que aumente o valor total: incluir um item numa
+    mochila que o comporte ou trocar um item de dentro por um de fora mais caro
+    que caiba. Para quando nenhum movimento melhora a solução.
+
+    :param state: Assignment inicial, modificado no lugar.
+    :param cancel: cancellation.Token da requisição (opcional).
+    :return: Número de movimentos avaliados.
+    """
+    n = len(state.items)
+    targets = list(range(len(state.max_weights)))
+    evaluated = 0
+    improved = True
+    while improved:
+        improved = False
+        for j in range(n):
+            cancellation.check(cancel)
+            for k in targets:
+                evaluated += 1
+                delta = state.shift_delta(j, k)
+                if delta is not None and delta > 0:
+                    state.shift(j, k)
+                    improved = True
+                    break
+            for i in range(n):
+                evaluated += 1
+                delta = state.swap_delta(j, i)
+                if delta is not None and delta > 0:
+                    state.swap(j, i)
+                    improved = True
+            if state.items[j] == UNASSIGNED:
+                evaluated += make_room(state, j)
+                improved = improved or state.items[j] != UNASSIGNED
+    metrics.SOLVER_EVALUATIONS.inc(evaluated)
+    return evaluated
+# ------------------------------------------------------------------------------------
+def make_room(state, j):
+    """
+    Tenta incluir o item `j`, que está fora de todas as mochilas, deslocando
+    antes um item de uma mochila cheia para outra mochila onde ele caiba.
+
+    :param state: Assignment, modificado no lugar se o movimento for possível.
+    :param j: Índice de um item fora das mochilas.
+    :return: Número de movimentos avaliados.
+    """
+    weight = state.weights[j]
+    evaluated = 0
+    for i, k in enumerate(state.items):
+        if k == UNASSIGNED or state.loads[k] - state.weights[i] + weight > state.max_weights[k]:
+            continue
+        for target in range(len(state.max_weights)):
+            evaluated += 1
+            if target != k and state.fits(target, state.weights[i]):
+                state.shift(i, target)
+                state.shift(j, k)
+                return evaluated
+    return evaluated
+
+# TEMPERATURE METHOD -----------------------------------------------------------------
+def check_schedule(ti, tf, fr, moves=None):
+    """
+    Valida o esquema de resfriamento da têmpera.
+
+    :param ti: Temperatura inicial.
+    :param tf: Temperatura final.
+    :param fr: Fator de resfriamento/redutor.
+    :param moves: Movimentos por temperatura (opcional).
+    :raises ValueError: Se algum parâmetro for inválido; com fr >= 1 a têmpera
+        não terminaria.
+    """
+    if not _is_number(ti) or not _is_number(tf) or not 0 < tf < ti:
+        raise ValueError("Temperatures must be numbers with 0 < 'final_temperature' < 'initial_temperature'.")
+    if not _is_number(fr) or not 0 < fr < 1:
+        raise ValueError("'reducer_factor' must be a number between 0 and 1 (exclusive).")
+    if moves is not None and (isinstance(moves, bool) or not isinstance(moves, int) or moves < 1):
+        raise ValueError("'moves_per_temperature' must be a positive integer.")
+# ------------------------------------------------------------------------------------
+def random_move(state):
+    """
+    Sorteia um deslocamento ou uma troca.
+
+    :return: Tupla (tipo, i, destino, variação), ou None se o movimento sorteado é inviável.
+    """
+    n = len(state.items)
+    j = rd.randrange(n)
+    if rd.random() < 0.5:
+        k = rd.randrange(UNASSIGNED, len(state.max_weights))
+        delta = state.shift_delta(j, k)
+        return None if delta is None else ('shift', j, k, delta)
+    i = rd.randrange(n)
+    delta = state.swap_delta(j, i)
+    return None if delta is None else ('swap', j, i, delta)
+# ------------------------------------------------------------------------------------
+def tempera(state, ti=100, tf=0.1, fr=0.95, moves=None, cancel=None):
+    """
+    Têmpera simulada sobre a atribuição, maximizando o custo total.
+
+    :param state: Assignment inicial, modificado no lugar.
+    :param ti: Temperatura inicial.
+    :param tf: Temperatura final.
+    :param fr: Fator de resfriamento/redutor.
+    :param moves: Movimentos sorteados por temperatura (padrão: número de itens).
+    :param cancel: cancellation.Token da requisição (opcional).
+    :return: Tupla (melhor atribuição, melhor valor, passos de resfriamento).
+    """
+    moves = moves or max(1, len(state.items))
+    best_items, best_value = list(state.items), state.value
+    t = ti
+    steps = 0
+    evaluated = 0
+    while t > tf:
+        cancellation.check(cancel)
+        for _ in range(moves):
+            move = random_move(state)
+            evaluated += 1
+            if move is None:
+                continue
+            kind, a, b, delta = move
+            if delta >= 0 or rd.random() < math.exp(delta / t):
+                if kind == 'shift':
+                    state.shift(a, b)
+                else:
+                    state.swap(a, b)
+                if state.value > best_value:
+                    best_items, best_value = list(state.items), state.value
+        t *= fr
+        steps += 1
+    log.debug("Multi-knapsack tempera: %s steps, best value %s", steps, best_value)
+    metrics.SOLVER_TEMPERATURE_STEPS.inc(steps)
+    metrics.SOLVER_EVALUATIONS.inc(evaluated)
+    return best_items, best_value, steps
+
+# SOLVER -----------------------------------------------------------------------------
+def solve(weights, costs, max_weights, method='tempera', assignment=None, ti=100, tf=0.1, fr=0.95, moves=None, cancel=None):
+    """
+    Resolve a mochila múltipla com itens compartilhados.
+
+    :param weights: Lista de pesos dos itens.
+    :param costs: Lista de custos dos itens.
+    :param max_weights: Lista de capacidades de cada mochila.
+    :param method: 'tempera' (têmpera seguida de busca local) ou 'local_search'.
+    :param assignment: Atribuição inicial (padrão: greedy_assignment).
+    :param ti: Temperatura inicial.
+    :param tf: Temperatura final.
+    :param fr: Fator de resfriamento/redutor.
+    :param moves: Movimentos por temperatura na têmpera.
+    :param cancel: cancellation.Token da requisição (opcional).
+    :return: Dicionário com a atribuição final, as cargas e os valores inicial e final.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Invalid method '{method}', expected one of {METHODS}.")
+    check_problem(weights, costs, max_weights, assignment)
+    check_schedule(ti, tf, fr, moves)
+    if assignment is None:
+        assignment = greedy_assignment(weights, costs, max_weights)
+    state = Assignment(weights, costs, max_weights, assignment)
+    initial_value = state.value
+
+    if method == 'tempera':
+        best_items, _, _ = tempera(state, ti, tf, fr, moves, cancel)
+        state = Assignment(weights, costs, max_weights, best_items)
+    local_search(state, cancel)
+
+    return {
+        'assignment': state.items,
+        'loads': state.loads,
+        'initial_value': initial_value,
+        'final_value': state.value,
+    }
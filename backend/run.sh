@@ -2,4 +2,8 @@ python3 -m venv venv
 source venv/bin/activate
 pip install -r requirements.txt
 pip install flask flask-cors pytest scipy
-python3 -m flask run
+if [ "$1" = "prod" ]; then
+    python3 serve.py
+else
+    python3 -m flask run
+fi
@@ -0,0 +1,49 @@
+import argparse
+import logging
+import os
+from typing import List
+from waitress import serve # type: ignore
+import workers
+from app import app, limiter
+
+# Production entry point: waitress (threaded WSGI server) in front of the
+# solver process pool. Request threads only parse JSON and wait on futures, so
+# a long genetic_algorithm run never blocks `/` or `/metrics`.
+#
+#   python serve.py --host 0.0.0.0 --port 5000
+#
+# See workers.py for the pool size, deadline and per-route limit settings.
+
+def solver_routes() -> List[str]:
+    """URL rules of the views wrapped by app.solver_route."""
+    return [
+        rule.rule for rule in app.url_map.iter_rules()
+        if getattr(app.view_functions[rule.endpoint], 'is_solver_route', False)
+    ]
+
+def default_threads() -> int:
+    """One thread per solver route slot, plus spare ones for the health check,
+    /metrics and the cheap routes."""
+    return sum(limiter.limit(route) for route in solver_routes()) + 4
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Serve the linear programming API in production mode.')
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('THREADS', default_threads())))
+    args = parser.parse_args()
+
+    # app.py configures DEBUG logging for development; keep the solver debug
+    # output out of production logs. Set the level before warming the pool so
+    # the workers inherit it.
+    logging.getLogger().setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+
+    logging.info(f"Starting {workers.pool_size()} solver workers")
+    workers.warm_up()
+    logging.info(f"Serving on http://{args.host}:{args.port} with {args.threads} threads")
+    # A lookahead keeps reading the socket while a request runs, which is how
+    # waitress notices a client that went away (app.client_disconnected).
+    serve(app, host=args.host, port=args.port, threads=args.threads, channel_request_lookahead=1)
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,11 @@
 import random as rd
 import math
+import time
 import logging as log
 import numpy as np # type: ignore
-from scipy.optimize import linprog # type: ignore
+import cancellation
+import convergence
+import metrics
 
 # SIMPLEX METHOD ---------------------------------------------------------------------
 def simplex_method(l_in, r_in, z, l_eq=None, r_eq=None, l_x=None):
@@ -17,8 +20,11 @@ def simplex_method(l_in, r_in, z, l_eq=None, r_eq=None, l_x=None):
     :param l_x: Bounds for the variables (optional).
     :return: A dictionary containing the result of the optimization.
     """
+    # scipy.optimize custa mais que todo o resto da importação do app; só é
+    # carregado quando um PL é resolvido (os workers já o importam no boot).
+    from scipy.optimize import linprog # type: ignore
 
-
+    start = time.perf_counter()
     result = linprog(
         c=z,
         A_ub=l_in,
@@ -28,6 +34,7 @@ def simplex_method(l_in, r_in, z, l_eq=None, r_eq=None, l_x=None):
         bounds=l_x,
         method='highs'
     )
+    metrics.LP_SOLVE_SECONDS.observe(time.perf_counter() - start)
 
     return {
         'result': -result.fun if result.success else None,  # Negate if maximizing
@@ -66,6 +73,11 @@ def generate_initial_solution(n, max_weights, weights):
     """
     Gera uma solução inicial aleatória para o problema da mochila múltipla.
 
+    A semeadura pela relaxação linear (SEEDING_MODES) só é oferecida ao AG: ela
+    maximiza o custo total, enquanto a subida de encosta minimiza e a têmpera
+    maximiza a razão custo/peso, então uma semente guiada pela relaxação não
+    favorece os métodos de busca local (ver bench_seeding.py).
+
     :param n: Lista de número de itens de cada mochila.
     :param max_weights: Lista de máximo de peso de cada mochila.
     :param weights: Lista de pesos dos itens para cada mochila.
@@ -98,6 +110,7 @@ def evaluate_solution(solution, weights, costs):
 
     :return: Uma tupla contendo o custo total e o peso total da solução.
     """
+    metrics.SOLVER_EVALUATIONS.inc()
     total_cost = evaluate_array(solution, costs)
     total_weight = evaluate_array(solution, weights)
     current_value = total_cost / total_weight if total_weight > 0 else 0
@@ -115,8 +128,103 @@ def evaluate_array(solution, values):
     total = sum(solution[i] * values[i] for i in range(len(solution)))
     return total
 
+# SEEDING ----------------------------------------------------------------------------
+# Semeadura da população inicial do AG pela relaxação linear. Não vale para as
+# soluções iniciais dos métodos de busca local (ver generate_initial_solution).
+SEEDING_MODES = ('random', 'greedy', 'lp')
+
+def check_seeding(seeding, costs):
+    """
+    Valida o modo de semeadura das soluções iniciais.
+
+    :param seeding: Modo de geração pedido.
+    :param costs: Custos dos itens, necessários para os modos guiados pela relaxação.
+    """
+    if seeding not in SEEDING_MODES:
+        raise ValueError(f"Invalid seeding mode '{seeding}', expected one of {SEEDING_MODES}.")
+    if seeding != 'random' and costs is None:
+        raise ValueError(f"Seeding mode '{seeding}' requires the item costs.")
+# ------------------------------------------------------------------------------------
+def relaxation_solution(weights, costs, max_weight, seeding='greedy'):
+    """
+    Resolve a relaxação linear (0 <= x <= 1) de uma mochila.
+
+    No modo 'lp' usa simplex_method; no modo 'greedy' usa a solução equivalente
+    de Dantzig: itens em ordem decrescente de custo/peso até o item crítico,
+    que entra fracionado.
+
+    :param weights: Lista de pesos dos itens.
+    :param costs: Lista de custos dos itens.
+    :param max_weight: Peso máximo permitido.
+    :param seeding: 'lp' ou 'greedy'.
+    :return: Lista com a fração de cada item na solução relaxada.
+    """
+    n = len(weights)
+    if seeding == 'lp' and n > 0:
+        result = simplex_method(
+            l_in=[weights],
+            r_in=[max_weight],
+            z=[-c for c in costs],
+            l_x=[(0, 1)] * n
+        )
+        if result['x'] is not None:
+            return result['x']
+        log.warning(f"LP relaxation failed ({result['message']}), falling back to greedy.")
+
+    order = sorted(
+        range(n),
+        key=lambda i: costs[i] / weights[i] if weights[i] > 0 else math.inf,
+        reverse=True
+    )
+    relaxed = [0.0] * n
+    capacity = max_weight
+    for i in order:
+        if weights[i] <= capacity:
+            relaxed[i] = 1.0
+            capacity -= weights[i]
+        else:
+            relaxed[i] = capacity / weights[i] if capacity > 0 else 0.0
+            break
+    return relaxed
+# ------------------------------------------------------------------------------------
+def seeded_solution(relaxed, weights, max_weight, perturbation=0.1):
+    """
+    Constrói uma solução viável a partir da relaxação linear.
+
+    Arredonda a relaxação (o item fracionado entra com probabilidade igual à sua
+    fração, se couber), remove cada item escolhido com probabilidade
+    `perturbation` e completa a mochila com itens aleatórios que ainda cabem.
+
+    :param relaxed: Frações de cada item na solução relaxada.
+    :param weights: Lista de pesos dos itens.
+    :param max_weight: Peso máximo permitido.
+    :param perturbation: Probabilidade de remover cada item escolhido.
+    :return: Lista de 0s e 1s representando a solução.
+    """
+    n = len(relaxed)
+    solution = [0] * n
+    total_weight = 0
+    for i in range(n):
+        if relaxed[i] >= 1 - 1e-9 or rd.random() < relaxed[i]:
+            if total_weight + weights[i] <= max_weight:
+                solution[i] = 1
+                total_weight += weights[i]
+
+    if perturbation > 0:
+        for i in range(n):
+            if solution[i] == 1 and rd.random() < perturbation:
+                solution[i] = 0
+                total_weight -= weights[i]
+        indices = [i for i in range(n) if solution[i] == 0]
+        rd.shuffle(indices)
+        for i in indices:
+            if total_weight + weights[i] <= max_weight:
+                solution[i] = 1
+                total_weight += weights[i]
+    return solution
+
 # SLOPE CLIMBING ---------------------------------------------------------------------
-def successors(current_solution, current_value, max_weight, weights, costs):
+def successors(current_solution, current_value, max_weight, weights, costs, cancel=None):
     """
     Gera e avalia soluções sucessoras para o problema da mochila.
 
@@ -125,21 +233,23 @@ def successors(current_solution, current_value, max_weight, weights, costs):
     :param max_weight: Peso máximo permitido.
     :param weights: Lista de pesos dos itens.
     :param costs: Lista de custos dos itens.
+    :param cancel: cancellation.Token da requisição (opcional).
     
     :return: Lista com uma solução melhorada.
     """
-    log.debug(f"Starting successors with current_solution={current_solution}, current_value={current_value}, max_weight={max_weight}")
+    log.debug("Starting successors with current_solution=%s, current_value=%s, max_weight=%s", current_solution, current_value, max_weight)
     qs = 2 * len(current_solution)  
     p = 0
     best_successor = current_solution[:]
     best_value = current_value
     total_weight = evaluate_array(current_solution, weights)
-    log.debug(f"Initial total_weight={total_weight}")
+    log.debug("Initial total_weight=%s", total_weight)
 
     for it in range(qs):
+        cancellation.check(cancel)
         aux = current_solution[:]
         current_value = evaluate_solution(aux, weights, costs)
-        log.debug(f"Iteration {it}: aux={aux}, current_value={current_value}")
+        log.debug("Iteration %s: aux=%s, current_value=%s", it, aux, current_value)
         
         if sum(aux) == 0:
             log.debug("No items included in solution, skipping iteration.")
@@ -150,7 +260,7 @@ def successors(current_solution, current_value, max_weight, weights, costs):
             if (aux[p] == 1):
                 aux[p] = 0  # Reverte a troca se o item foi adicionado
                 current_value = evaluate_solution(aux, weights, costs)
-                log.debug(f"Removed item {p}: aux={aux}, current_value={current_value}")
+                log.debug("Removed item %s: aux=%s, current_value=%s", p, aux, current_value)
                 break
         k = p + 1
         for j in range(len(aux)):
@@ -159,23 +269,23 @@ def successors(current_solution, current_value, max_weight, weights, costs):
             aux[k] = 1
             current_value = evaluate_solution(aux, weights, costs)
             total_weight = evaluate_array(aux, weights)
-            log.debug(f"Trying to add item {k}: aux={aux}, current_value={current_value}, total_weight={total_weight}")
+            log.debug("Trying to add item %s: aux=%s, current_value=%s, total_weight=%s", k, aux, current_value, total_weight)
             if (total_weight > max_weight):
                 aux[k] = 0
-                log.debug(f"Exceeded max_weight after adding item {k}, reverting.")
+                log.debug("Exceeded max_weight after adding item %s, reverting.", k)
             k += 1
         current_value = evaluate_solution(aux, weights, costs)
         total_weight = evaluate_array(aux, weights)
-        log.debug(f"End of iteration {it}: aux={aux}, current_value={current_value}, total_weight={total_weight}")
+        log.debug("End of iteration %s: aux=%s, current_value=%s, total_weight=%s", it, aux, current_value, total_weight)
         if (total_weight <= max_weight and best_value > current_value):
             best_successor = aux[:]
             best_value = current_value
-            log.debug(f"New best_successor found: {best_successor}, best_value={best_value}")
+            log.debug("New best_successor found: %s, best_value=%s", best_successor, best_value)
             
-    log.debug(f"Returning best_successor={best_successor}, best_value={best_value}")
+    log.debug("Returning best_successor=%s, best_value=%s", best_successor, best_value)
     return best_successor, best_value
 # ------------------------------------------------------------------------------------
-def slope_climbing(solutions, current_values, weights, costs, max_weights):
+def slope_climbing(solutions, current_values, weights, costs, max_weights, cancel=None):
     """
     Executa a subida de encosta para um problema de mochila múltipla.
     
@@ -184,6 +294,7 @@ def slope_climbing(solutions, current_values, weights, costs, max_weights):
     :param weights: Lista de listas de pesos dos itens para cada mochila.
     :param costs: Lista de listas de custos dos itens para cada mochila.
     :param solutions: Lista de soluções iniciais para cada mochila.
+    :param cancel: cancellation.Token da requisição (opcional).
     
     :return: A list of solutions for each knapsack.
     """
@@ -191,7 +302,7 @@ def slope_climbing(solutions, current_values, weights, costs, max_weights):
     for i in range(len(solutions)):
         current_value = current_values[i]
         current_solution = solutions[i]
-        log.debug(f"Knapsack {i}: Initial solution={current_solution}, value={current_value}")
+        log.debug("Knapsack %s: Initial solution=%s, value=%s", i, current_solution, current_value)
         improved = True
         iteration = 0
         while improved:
@@ -201,22 +312,23 @@ def slope_climbing(solutions, current_values, weights, costs, max_weights):
                 current_value=current_value,
                 max_weight=max_weights[i],
                 weights=weights[i],
-                costs=costs[i]
+                costs=costs[i],
+                cancel=cancel
             )
-            log.debug(f"Knapsack {i}, Iteration {iteration}: best_successor={best_successor}, best_value={best_value}")
+            log.debug("Knapsack %s, Iteration %s: best_successor=%s, best_value=%s", i, iteration, best_successor, best_value)
             if best_value < current_value:
-                log.debug(f"Knapsack {i}, Iteration {iteration}: Improvement found! Updating solution.")
+                log.debug("Knapsack %s, Iteration %s: Improvement found! Updating solution.", i, iteration)
                 current_solution = best_successor
                 current_value = best_value
                 improved = True
             iteration += 1
         solutions[i] = current_solution
         current_values[i] = current_value
-        log.debug(f"Knapsack {i}: Final solution={current_solution}, value={current_value}")
+        log.debug("Knapsack %s: Final solution=%s, value=%s", i, current_solution, current_value)
     log.debug("Finished slope_climbing_method")
     return solutions, current_values
 # ------------------------------------------------------------------------------------
-def slope_climb_try_again(solutions, current_values, weights, costs, max_weights, Tmax=10):
+def slope_climb_try_again(solutions, current_values, weights, costs, max_weights, Tmax=10, cancel=None):
     """
     Executa a subida de encosta com lógica de tentativa e erro para um problema de mochila múltipla.
 
@@ -227,6 +339,7 @@ def slope_climb_try_again(solutions, current_values, weights, costs, max_weights
     :param weights: Lista de listas de pesos dos itens para cada mochila.
     :param costs: Lista de listas de custos dos itens para cada mochila.
     :param solutions: Lista de soluções iniciais para cada mochila.
+    :param cancel: cancellation.Token da requisição (opcional).
     
     :return: Lista de soluções para cada mochila, custos atuais e pesos atuais.
     """
@@ -234,40 +347,212 @@ def slope_climb_try_again(solutions, current_values, weights, costs, max_weights
     for i in range(len(solutions)):
         current_value = current_values[i]
         current_solution = solutions[i]
-        log.debug(f"Knapsack {i}: Initial solution={current_solution}, value={current_value}")
+        log.debug("Knapsack %s: Initial solution=%s, value=%s", i, current_solution, current_value)
         improved = True
         T = 1  # Inicializa o contador de tentativas
+        retries = 0
         iteration = 0
         while improved:
-            log.debug(f"Knapsack {i}, Iteration {iteration}, Try {T}: Calling successors")
+            log.debug("Knapsack %s, Iteration %s, Try %s: Calling successors", i, iteration, T)
             best_successor, best_value = successors(
                 current_solution=current_solution,
                 current_value=current_value,
                 max_weight=max_weights[i],
                 weights=weights[i],
-                costs=costs[i]
+                costs=costs[i],
+                cancel=cancel
             )
-            log.debug(f"Knapsack {i}, Iteration {iteration}, Try {T}: best_successor={best_successor}, best_value={best_value}")
+            log.debug("Knapsack %s, Iteration %s, Try %s: best_successor=%s, best_value=%s", i, iteration, T, best_successor, best_value)
             if best_value < current_value:
-                log.debug(f"Knapsack {i}, Iteration {iteration}, Try {T}: Improvement found! Updating solution.")
+                log.debug("Knapsack %s, Iteration %s, Try %s: Improvement found! Updating solution.", i, iteration, T)
                 current_solution = best_successor
                 current_value = best_value
                 T = 1  # Reinicia o contador de tentativas
             else:
                 T += 1  # Incrementa o contador de tentativas
-                log.debug(f"Knapsack {i}, Iteration {iteration}, Try {T}: No improvement. T={T}")
+                retries += 1
+                log.debug("Knapsack %s, Iteration %s, Try %s: No improvement. T=%s", i, iteration, T, T)
                 if T > Tmax:
-                    log.debug(f"Knapsack {i}, Iteration {iteration}, Try {T}: Tmax reached. Stopping.")
+                    log.debug("Knapsack %s, Iteration %s, Try %s: Tmax reached. Stopping.", i, iteration, T)
                     improved = False  # Para a execução se o número máximo de tentativas for atingido
             iteration += 1
+        metrics.SOLVER_RESTARTS.inc(retries)
         solutions[i] = current_solution
         current_values[i] = current_value
-        log.debug(f"Knapsack {i}: Final solution={current_solution}, value={current_value}")
+        log.debug("Knapsack %s: Final solution=%s, value=%s", i, current_solution, current_value)
     log.debug("Finished slope_climb_try_again_method")
     return solutions, current_values 
 
+# MULTI-START ------------------------------------------------------------------------
+RESTART_POLICIES = ('luby', 'geometric')
+RESTART_STARTS = ('perturbed', 'fresh')
+GEOMETRIC_FACTOR = 1.5
+
+def check_multistart(restarts, policy, start, base, perturbation, time_budget):
+    """
+    Valida os parâmetros da subida de encosta com reinícios.
+
+    :raises ValueError: Se algum parâmetro for inválido.
+    """
+    if isinstance(restarts, bool) or not isinstance(restarts, int) or restarts < 1:
+        raise ValueError("'restarts' must be a positive integer.")
+    if policy not in RESTART_POLICIES:
+        raise ValueError(f"Invalid restart policy '{policy}', expected one of {RESTART_POLICIES}.")
+    if start not in RESTART_STARTS:
+        raise ValueError(f"Invalid restart start '{start}', expected one of {RESTART_STARTS}.")
+    if base is not None and (isinstance(base, bool) or not isinstance(base, int) or base < 1):
+        raise ValueError("'restart_base' must be a positive integer.")
+    if isinstance(perturbation, bool) or not isinstance(perturbation, (int, float)) or not 0 <= perturbation <= 1:
+        raise ValueError("'perturbation' must be a number between 0 and 1.")
+    if time_budget is not None and (isinstance(time_budget, bool) or not isinstance(time_budget, (int, float)) or time_budget <= 0):
+        raise ValueError("'time_budget' must be a positive number of seconds.")
+# ------------------------------------------------------------------------------------
+def luby(i):
+    """
+    Termo `i` (a partir de 1) da sequência de Luby: 1, 1, 2, 1, 1, 2, 4, 1, ...
+
+    :param i: Posição na sequência.
+    :return: Multiplicador do orçamento do reinício.
+    """
+    while True:
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+# ------------------------------------------------------------------------------------
+def restart_budget(policy, r, base):
+    """
+    Número máximo de chamadas a `successors` do reinício `r` (a partir de 0).
+
+    :param policy: 'luby' (base · luby(r + 1)) ou 'geometric' (base · 1.5^r).
+    :param r: Índice do reinício.
+    :param base: Orçamento unitário.
+    """
+    if policy == 'luby':
+        return base * luby(r + 1)
+    return math.ceil(base * GEOMETRIC_FACTOR ** r)
+# ------------------------------------------------------------------------------------
+def climb(solution, value, weights, costs, max_weight, Tmax, budget, incumbent=None, stop_at=None, cancel=None):
+    """
+    Uma trajetória da subida de encosta (com Tmax = 1 é a de slope_climbing) limitada
+    a `budget` chamadas a `successors`.
+
+    Como em slope_climbing, valores menores são melhores. Uma trajetória que
+    para de melhorar com valor pior que o do incumbente é abandonada sem gastar
+    as tentativas restantes.
+
+    :param solution: Solução inicial.
+    :param value: Valor da solução inicial.
+    :param weights: Lista de pesos dos itens.
+    :param costs: Lista de custos dos itens.
+    :param max_weight: Peso máximo permitido.
+    :param Tmax: Número máximo de tentativas sem melhora.
+    :param budget: Número máximo de chamadas a successors.
+    :param incumbent: Melhor valor já encontrado pelos outros reinícios (opcional).
+    :param stop_at: Instante (time.monotonic) em que a busca deve parar (opcional).
+    :param cancel: cancellation.Token da requisição (opcional).
+
+    :return: Tupla (solução, valor, chamadas a successors feitas).
+    """
+    T = 1
+    steps = 0
+    while steps < budget:
+        if stop_at is not None and time.monotonic() >= stop_at:
+            break
+        best_successor, best_value = successors(
+            current_solution=solution,
+            current_value=value,
+            max_weight=max_weight,
+            weights=weights,
+            costs=costs,
+            cancel=cancel
+        )
+        steps += 1
+        if best_value < value:
+            solution, value = best_successor, best_value
+            T = 1
+            continue
+        T += 1
+        if T > Tmax or (incumbent is not None and incumbent <= value):
+            break
+    return solution, value, steps
+# ------------------------------------------------------------------------------------
+def multi_start(solution, current_value, weights, costs, max_weight, restarts, Tmax=1, policy='luby', base=None,
+                start='perturbed', perturbation=0.1, time_budget=None, from_start=True, first=0, shared=None,
+                cancel=None):
+    """
+    Subida de encosta com reinícios para uma mochila.
+
+    Cada reinício parte de uma perturbação da melhor solução encontrada até
+    então (start='perturbed') ou de uma solução aleatória nova (start='fresh'),
+    com orçamento dado pela política de reinício; o melhor valor encontrado é
+    compartilhado com os reinícios seguintes para abandonar trajetórias sem
+    chance de superá-lo. Com `shared`, o melhor valor também é trocado com as
+    outras tarefas da mesma mochila.
+
+    :param solution: Solução inicial.
+    :param current_value: Valor da solução inicial (None para calcular).
+    :param weights: Lista de pesos dos itens.
+    :param costs: Lista de custos dos itens.
+    :param max_weight: Peso máximo permitido.
+    :param restarts: Número máximo de reinícios.
+    :param Tmax: Número máximo de tentativas sem melhora de cada trajetória.
+    :param policy: Política de reinício: 'luby' ou 'geometric'.
+    :param base: Orçamento unitário da política, em chamadas a successors
+        (padrão: número de itens).
+    :param start: Ponto de partida dos reinícios: 'perturbed' ou 'fresh'.
+    :param perturbation: Probabilidade de remover cada item ao perturbar.
+    :param time_budget: Tempo máximo em segundos (opcional).
+    :param from_start: Se o primeiro reinício sobe a partir de `solution` sem perturbá-la.
+    :param first: Posição do primeiro reinício na sequência da política; tarefas
+        paralelas recebem trechos consecutivos da mesma sequência.
+    :param shared: incumbents.Incumbent da tarefa (opcional).
+    :param cancel: cancellation.Token da requisição (opcional).
+
+    :return: Tupla (melhor solução, melhor valor, reinícios executados).
+    """
+    check_multistart(restarts, policy, start, base, perturbation, time_budget)
+    stop_at = time.monotonic() + time_budget if time_budget is not None else None
+    if current_value is None:
+        current_value = evaluate_solution(solution, weights, costs)
+    if base is None:
+        base = max(1, len(weights))
+    best_solution, best_value = list(solution), current_value
+    runs = 0
+    for r in range(restarts):
+        if stop_at is not None and time.monotonic() >= stop_at:
+            break
+        # A trajetória que sobe a partir do próprio incumbente só é comparada
+        # com o das outras tarefas: abandoná-la na primeira tentativa sem
+        # melhora ignoraria Tmax.
+        others = shared.value() if shared is not None else math.inf
+        incumbent = min(best_value, others)
+        if r == 0 and from_start:
+            candidate, value = best_solution, best_value
+            incumbent = others
+        elif start == 'perturbed':
+            candidate = seeded_solution(best_solution, weights, max_weight, perturbation)
+            value = evaluate_solution(candidate, weights, costs)
+        else:
+            candidate = seeded_solution([0] * len(weights), weights, max_weight, perturbation=1.0)
+            value = evaluate_solution(candidate, weights, costs)
+        candidate, value, steps = climb(
+            candidate, value, weights, costs, max_weight, Tmax,
+            budget=restart_budget(policy, first + r, base), incumbent=incumbent, stop_at=stop_at, cancel=cancel
+        )
+        runs += 1
+        log.debug("Restart %s: value=%s after %s steps, incumbent=%s", r, value, steps, best_value)
+        if value < best_value:
+            best_solution, best_value = candidate, value
+            if shared is not None:
+                shared.offer(best_value)
+    metrics.SOLVER_MULTISTARTS.inc(runs)
+    return best_solution, best_value, runs
+
 # TEMPERATURE METHOD -----------------------------------------------------------------
-def tempera(solution, weights, costs, va, max_weight, ti=10, tf=0.1, fr=0.95):
+def tempera(solution, weights, costs, va, max_weight, ti=10, tf=0.1, fr=0.95, trace=None, cancel=None):
     """
     :param solution: Lista de 0s e 1s representando a solução atual (itens incluídos/excluídos).
     :param weight: Peso total da solução atual.
@@ -277,33 +562,51 @@ def tempera(solution, weights, costs, va, max_weight, ti=10, tf=0.1, fr=0.95):
     :param fr: Fator de resfriamento/redutor.
     :param va: Valor atual da solução.
     :param max_weight: Peso máximo permitido.
+    :param trace: convergence.Trace com os campos TEMPERA_FIELDS (opcional).
+    :param cancel: cancellation.Token da requisição (opcional).
     
     :return: Uma nova solução e o custo dessa solução após o processo de resfriamento.
     """
-    log.debug(f"Starting tempera with solution={solution}, weights={weights}, costs={costs}, va={va}, max_weight={max_weight}, ti={ti}, tf={tf}, fr={fr}")
+    log.debug("Starting tempera with solution=%s, weights=%s, costs=%s, va=%s, max_weight=%s, ti=%s, tf=%s, fr=%s", solution, weights, costs, va, max_weight, ti, tf, fr)
     current_solution = solution[:]
     t = ti
     iteration = 0
+    best = va
+    accepted = 0
+    window = 0
     while t > tf:
-        log.debug(f"Iteration {iteration}: t={t}, current_solution={current_solution}, va={va}")
+        cancellation.check(cancel, iteration)
+        log.debug("Iteration %s: t=%s, current_solution=%s, va=%s", iteration, t, current_solution, va)
         novo, vn = successor(solution=current_solution, max_weight=max_weight, weights=weights, costs=costs)
         de = va - vn
-        log.debug(f"Iteration {iteration}: novo={novo}, vn={vn}, de={de}")
+        log.debug("Iteration %s: novo=%s, vn=%s, de=%s", iteration, novo, vn, de)
         if de < 0:
-            log.debug(f"Iteration {iteration}: Accepting better solution.")
+            log.debug("Iteration %s: Accepting better solution.", iteration)
             current_solution = novo[:]
             va = vn
         else:
             prob = rd.uniform(0,1)
             aux = math.exp(-de/t)
-            log.debug(f"Iteration {iteration}: prob={prob}, aux={aux}")
+            log.debug("Iteration %s: prob=%s, aux=%s", iteration, prob, aux)
             if prob < aux:
-                log.debug(f"Iteration {iteration}: Accepting worse solution by probability.")
+                log.debug("Iteration %s: Accepting worse solution by probability.", iteration)
                 current_solution = novo[:]
                 va = vn
+                accepted += 1
+        if trace is not None:
+            if de < 0:
+                accepted += 1
+            window += 1
+            best = max(best, va)
+            if trace.due(iteration):
+                trace.record(iteration, best, va, t, accepted / window)
+                accepted = window = 0
         t = t * fr
         iteration += 1
-    log.debug(f"Finished tempera: final_solution={current_solution}, final_value={va}")
+    if trace is not None:
+        trace.finish(iteration, max(best, va), va, t, accepted / window if window else 0.0)
+    metrics.SOLVER_TEMPERATURE_STEPS.inc(iteration)
+    log.debug("Finished tempera: final_solution=%s, final_value=%s", current_solution, va)
     return current_solution, va 
 # ------------------------------------------------------------------------------------
 def successor(solution, max_weight, weights, costs):
@@ -317,51 +620,67 @@ def successor(solution, max_weight, weights, costs):
     
     :return: Uma nova solução (sucessor) e o valor dessa solução.
     """
-    log.debug(f"Generating successor for solution={solution}, weights={weights}, costs={costs}, max_weight={max_weight}")
+    log.debug("Generating successor for solution=%s, weights=%s, costs=%s, max_weight=%s", solution, weights, costs, max_weight)
     new = solution[:]
     p = rd.randint(0, len(solution)-1)
     new[p] = 1 - new[p]  # Flip the bit (0 -> 1 or 1 -> 0)
-    log.debug(f"Flipped position {p}: new={new}")
+    log.debug("Flipped position %s: new=%s", p, new)
 
     total_weight = evaluate_array(new, weights)
     if total_weight > max_weight:
-        log.debug(f"Exceeded max_weight after flipping item {p}, reverting.")
+        log.debug("Exceeded max_weight after flipping item %s, reverting.", p)
         new[p] = solution[p]  # Reverte a mudança
 
     current_value = evaluate_solution(new, weights, costs)
-    log.debug(f"Successor evaluated: new={new}, current_value={current_value}")
+    log.debug("Successor evaluated: new=%s, current_value=%s", new, current_value)
     return new, current_value
 
 # GENETIC ALGORITHM -----------------------------------------------------------------
-def ordena(p, f):
+def ordena(f, k=None):
     """ 
-    Ordena a população e a aptidão de forma decrescente.
+    Índices dos `k` indivíduos mais aptos, em ordem decrescente de aptidão.
+
+    Com `k` menor que a população, argpartition separa os `k` primeiros e só eles
+    são ordenados; a população em si não é movida.
     
-    :param p: População.
     :param f: Aptidão.
+    :param k: Quantos índices devolver (padrão: todos).
     
-    :return: População e aptidão ordenadas.
-    """
-    aux = sorted(zip(p, f), key=lambda x: x[1], reverse=True) 
-    p, f = zip(*aux)
-    p = list(p)
-    f = list(f)
-    log.debug(f"População ordenada: {p}")
-    log.debug(f"Aptidão ordenada: {f}")
-    return p, f
+    :return: Vetor de índices ordenados.
+    """
+    k = len(f) if k is None else k
+    if k <= 0:
+        return np.empty(0, np.intp)
+    if k < len(f):
+        top = np.argpartition(f, len(f) - k)[len(f) - k:]
+    else:
+        top = np.arange(len(f))
+    return top[np.argsort(f[top], kind='stable')[::-1]]
 #------------------------------------------------------------------------------------
-def pop_ini(n, tp, vet, c_max):
+def pop_ini(n, tp, vet, c_max, cost=None, seeding='random'):
     """
-    Gera a população inicial aleatória para o algoritmo genético.
+    Gera a população inicial para o algoritmo genético.
+
+    Fora do modo 'random', os indivíduos vêm da relaxação linear com perturbação
+    crescente: o primeiro é o arredondamento puro e os últimos ficam próximos de
+    soluções aleatórias, o que mantém a diversidade da população.
     
     :param n: Número de itens.
     :param tp: Tamanho da população.
     :param vet: Vetor de pesos dos itens.
     :param c_max: Peso máximo permitido.
+    :param cost: Vetor de custos dos itens (obrigatório fora do modo 'random').
+    :param seeding: Modo de geração: 'random', 'greedy' ou 'lp'.
     
     :return: População inicial como uma matriz de 0s e 1s.
     """
+    check_seeding(seeding, cost)
     pop = np.zeros((tp,n),int)
+    if seeding != 'random':
+        relaxed = relaxation_solution(vet, cost, c_max, seeding)
+        for i in range(tp):
+            pop[i] = seeded_solution(relaxed, vet, c_max, perturbation=i / tp)
+        return pop
     for i in range(tp):
         v = 0
         c = 0
@@ -373,10 +692,9 @@ def pop_ini(n, tp, vet, c_max):
                 c += 1
         if c != n:
             pop[i][j] = 0
-    log.debug(f"População inicial gerada: {pop}")
     return pop
 #------------------------------------------------------------------------------------
-def aptidao(vet, p, tp, c_max, cost):
+def aptidao(vet, p, tp, c_max, cost, out=None):
     """
     Calcula a aptidão de cada indivíduo na população.
     
@@ -385,19 +703,18 @@ def aptidao(vet, p, tp, c_max, cost):
     :param p: População.
     :param tp: Tamanho da população.
     :param c_max: Peso máximo permitido.
+    :param out: Vetor de tp floats reaproveitado para a aptidão (opcional).
     
-    :return: Vetor de aptidão normalizado.
+    :return: Vetor de aptidão normalizado (`out`, se informado).
     """
-    fit = np.zeros(tp,float)
+    fit = np.zeros(tp, float) if out is None else out
+    fit[:] = 0
     for i in range(tp):
         if fit[i] == c_max:
             fit[i] = c_max * 1000
         else:
             fit[i] = evaluate_solution(p[i],vet,cost)
-    soma = sum(fit)
-    log.debug(f"Aptidão bruta: {fit}")
-    fit = fit / soma
-    log.debug(f"Aptidão normalizada: {fit}")
+    fit /= fit.sum()
     return fit
 #------------------------------------------------------------------------------------
 def roleta(fit, tp):
@@ -415,7 +732,7 @@ def roleta(fit, tp):
     while soma < ale and ind < tp - 1:
         ind += 1
         soma += fit[ind]
-    log.debug(f"Selecionado por roleta: índice={ind}")
+    log.debug("Selecionado por roleta: índice=%s", ind)
     return ind
 #------------------------------------------------------------------------------------
 def torneio(tp, fit):
@@ -430,10 +747,10 @@ def torneio(tp, fit):
     p1 = rd.randrange(tp)
     p2 = rd.randrange(tp)
     vencedor = p1 if fit[p1] > fit[p2] else p2
-    log.debug(f"Torneio entre {p1} e {p2}, vencedor: {vencedor}")
+    log.debug("Torneio entre %s e %s, vencedor: %s", p1, p2, vencedor)
     return vencedor
 #------------------------------------------------------------------------------------
-def cruzamento(p1, p2, ponto, n):
+def cruzamento(p1, p2, ponto, n, d1=None, d2=None):
     """
     Realiza o cruzamento entre dois indivíduos da população.
     
@@ -441,13 +758,17 @@ def cruzamento(p1, p2, ponto, n):
     :param p2: Segundo indivíduo.
     :param ponto: Ponto de cruzamento.
     :param n: Tamanho do indivíduo.
+    :param d1: Vetor que recebe o primeiro descendente (opcional; não pode ser p1 nem p2).
+    :param d2: Vetor que recebe o segundo descendente (opcional; não pode ser p1 nem p2).
     
     :return: Dois novos indivíduos gerados pelo cruzamento.
     """
-    log.debug(f"Cruzamento no ponto {ponto} entre {p1} e {p2}")
-    d1 = np.concatenate((p1[0:ponto], p2[ponto:n]))
-    d2 = np.concatenate((p2[0:ponto], p1[ponto:n]))
-    log.debug(f"Descendentes gerados: {d1}, {d2}")
+    log.debug("Cruzamento no ponto %s entre %s e %s", ponto, p1, p2)
+    d1 = np.empty_like(p1) if d1 is None else d1
+    d2 = np.empty_like(p2) if d2 is None else d2
+    d1[:ponto], d1[ponto:n] = p1[:ponto], p2[ponto:n]
+    d2[:ponto], d2[ponto:n] = p2[:ponto], p1[ponto:n]
+    log.debug("Descendentes gerados: %s, %s", d1, d2)
     return d1, d2
 #------------------------------------------------------------------------------------
 def mutacao(d, n):
@@ -461,10 +782,10 @@ def mutacao(d, n):
     """
     pos = rd.randrange(n)
     d[pos] = 1 - d[pos]
-    log.debug(f"Mutação na posição {pos}: {d}")
+    log.debug("Mutação na posição %s: %s", pos, d)
     return d
 #------------------------------------------------------------------------------------
-def descendentes(n, pop, fit, tp, tc, tm):
+def descendentes(n, pop, fit, tp, tc, tm, out=None):
     """
     Gera os descendentes da população atual usando cruzamento e mutação.
     
@@ -474,46 +795,51 @@ def descendentes(n, pop, fit, tp, tc, tm):
     :param tp: Tamanho da população.
     :param tc: Taxa de cruzamento.
     :param tm: Taxa de mutação.
+    :param out: Matriz (3·tp x n) reaproveitada para os descendentes (opcional).
     
     :return: Tupla contendo os descendentes e o número de descendentes gerados.
     """
     log.debug("Gerando descendentes.")
     qd = 3 * tp
-    desc = np.zeros((qd, n), int)
+    desc = np.zeros((qd, n), int) if out is None else out
+    if qd % 2:
+        desc[qd - 1] = 0  # Sem par para o cruzamento, fica vazio.
     corte = rd.randint(0, n - 1)
     i = 0
     while i < qd - 1:
         p1 = pop[roleta(fit, tp)]
         p2 = pop[roleta(fit, tp)]
         if rd.uniform(0, 1) <= tc:
-            desc[i], desc[i + 1] = cruzamento(p1, p2, corte, n)
+            cruzamento(p1, p2, corte, n, desc[i], desc[i + 1])
         else:
             desc[i], desc[i + 1] = p1, p2
         if rd.uniform(0, 1) <= tm:
-            desc[i] = mutacao(desc[i], n)
+            mutacao(desc[i], n)
         if rd.uniform(0, 1) <= tm:
-            desc[i + 1] = mutacao(desc[i + 1], n)
+            mutacao(desc[i + 1], n)
         i += 2
-    log.debug(f"Descendentes gerados: {desc}")
     return desc, qd
 #------------------------------------------------------------------------------------
-def nova_pop(pop, desc, tp, ig):
+def nova_pop(pop, fit, desc, fit_d, tp, ig, out):
     """
-    Gera uma nova população combinando a população atual e os descendentes.
+    Gera uma nova população com a elite da população atual e os descendentes
+    mais aptos, escrita em `out` (o outro buffer da população).
     
     :param pop: População atual.
+    :param fit: Vetor de aptidão da população.
     :param desc: Descendentes gerados.
+    :param fit_d: Vetor de aptidão dos descendentes.
     :param tp: Tamanho da população.
-    :param ig: Proporção de indivíduos da população atual a serem mantidos (elite
+    :param ig: Proporção de indivíduos da população atual a serem mantidos (elite).
+    :param out: Matriz (tp x n) que recebe a nova população; não pode ser `pop`.
     
-    :return: Nova população combinada.
+    :return: Nova população combinada (`out`).
     """
-    elite = math.ceil(ig * tp)
-    log.debug(f"Gerando nova população. Elite: {elite}")
-    for i in range(tp - elite):
-        pop[i + elite] = desc[i]
-    log.debug(f"Nova população: {pop}")
-    return pop
+    elite = min(math.ceil(ig * tp), tp)
+    log.debug("Gerando nova população. Elite: %s", elite)
+    np.take(pop, ordena(fit, elite), axis=0, out=out[:elite])
+    np.take(desc, ordena(fit_d, tp - elite), axis=0, out=out[elite:])
+    return out
 #------------------------------------------------------------------------------------
 def ajusta_restricao(n, vet, desc, qd, c_max, cost):
     """
@@ -530,17 +856,40 @@ def ajusta_restricao(n, vet, desc, qd, c_max, cost):
     """
     log.debug("Ajustando restrições dos descendentes.")
     for i in range(qd):
-        peso = evaluate_solution(desc[i], vet, cost)
+        peso = evaluate_array(desc[i], vet)
         while peso > c_max:
-            log.debug(f"Descendente {i} excedeu o peso máximo: {peso} > {c_max}. Ajustando...")
+            log.debug("Descendente %s excedeu o peso máximo: %s > %s. Ajustando...", i, peso, c_max)
             j = rd.randrange(n)
             if desc[i][j] == 1:
                 desc[i][j] = 0
                 peso -= vet[j]
-    log.debug(f"Descendentes ajustados: {desc}")
     return desc
 #------------------------------------------------------------------------------------
-def genetic_algorithm(length, weight, cost, max_weight, population_size, generations, cross_over_rate, mutation_rate, keep_individuals_rate):
+def trace_generation(trace, step, pop, fit, cost, best, final=False):
+    """
+    Grava uma amostra do rastro de convergência do algoritmo genético.
+
+    :param trace: convergence.Trace com os campos GENETIC_FIELDS.
+    :param step: Geração atual.
+    :param pop: População.
+    :param fit: Aptidão da população.
+    :param cost: Vetor de custos dos itens.
+    :param best: Maior custo total visto até aqui.
+    :param final: Grava como estado final (Trace.finish).
+
+    :return: O maior custo total visto, incluindo esta geração.
+    """
+    pop = np.asarray(pop)
+    values = pop @ np.asarray(cost)
+    best = max(best, float(values.max()))
+    sample = (best, float(values[int(np.argmax(fit))]), convergence.population_diversity(pop))
+    if final:
+        trace.finish(step, *sample)
+    else:
+        trace.record(step, *sample)
+    return best
+#------------------------------------------------------------------------------------
+def genetic_algorithm(length, weight, cost, max_weight, population_size, generations, cross_over_rate, mutation_rate, keep_individuals_rate, seeding='random', start_solution=None, trace=None, cancel=None):
     """
     Executa o algoritmo genético para resolver o problema da mochila.
     
@@ -553,41 +902,167 @@ def genetic_algorithm(length, weight, cost, max_weight, population_size, generat
     :param cross_over_rate: Taxa de cruzamento.
     :param mutation_rate: Taxa de mutação.
     :param keep_individuals_rate: Proporção de indivíduos da população atual a serem mantidos (elite).
+    :param seeding: Modo de geração da população inicial: 'random', 'greedy' ou 'lp'.
+    :param start_solution: Solução viável incluída na população inicial (opcional).
+    :param trace: convergence.Trace com os campos GENETIC_FIELDS (opcional). Grava o
+        custo total do indivíduo mais apto ('current'), o maior custo total já visto
+        na população ('best') e a diversidade da população.
+    :param cancel: cancellation.Token da requisição (opcional).
     
     :return: Tupla contendo a solução inicial, solução final, valor da solução inicial e valor da solução final.
     """
     log.debug("Iniciando algoritmo genético.")
-    pop = pop_ini(length, population_size, weight, max_weight)
+    pop = pop_ini(length, population_size, weight, max_weight, cost, seeding)
+    if start_solution is not None:
+        pop[0] = start_solution
+    # População em dois buffers alternados e descendentes num terceiro, todos
+    # alocados uma única vez, assim como os vetores de aptidão; cada geração só
+    # escreve no buffer livre.
+    spare = np.empty_like(pop)
+    desc = np.zeros((3 * population_size, length), pop.dtype)
     fit = aptidao(weight, pop, population_size, max_weight, cost)
-    pop, fit = ordena(pop, fit)
-    si = pop[0]
-    log.debug(f"Solução inicial: {si}")
+    fit_d = np.empty(3 * population_size, float)
+    si = pop[ordena(fit, 1)[0]].copy()
+    log.debug("Solução inicial: %s", si)
+    best = -math.inf
+    if trace is not None:
+        best = trace_generation(trace, 0, pop, fit, cost, best)
     for g in range(generations):
-        log.debug(f"Geração {g}")
+        cancellation.check(cancel)
+        log.debug("Geração %s", g)
         desc, qd = descendentes(length, pop, fit, 
-                                population_size, cross_over_rate, mutation_rate)
+                                population_size, cross_over_rate, mutation_rate, out=desc)
         desc = ajusta_restricao(length, weight, desc, qd, max_weight, cost)
-        log.debug(f"Descendentes gerados: {desc}")
-        
-        fit_d = aptidao(weight, desc, qd, max_weight, cost)
-        log.debug(f"Aptidão dos descendentes: {fit_d}")
         
-        pop, fit = ordena(pop, fit)
-        desc, fit_d = ordena(desc, fit_d)
-        log.debug(f"População e descendentes ordenados.")
+        fit_d = aptidao(weight, desc, qd, max_weight, cost, out=fit_d)
         
-        pop = nova_pop(pop, desc, population_size, keep_individuals_rate)
-        log.debug(f"Nova população gerada: {pop}")
+        pop, spare = nova_pop(pop, fit, desc, fit_d, population_size, keep_individuals_rate, out=spare), pop
         
-        fit = aptidao(weight, pop, population_size, max_weight, cost)
-        log.debug(f"Aptidão final: {fit}")
+        fit = aptidao(weight, pop, population_size, max_weight, cost, out=fit)
+        if trace is not None and trace.due(g + 1):
+            best = trace_generation(trace, g + 1, pop, fit, cost, best)
     
-    pop, fit = ordena(pop, fit)
-    sf = pop[0]
-    log.debug(f"Solução final: {sf}")
+    if trace is not None:
+        trace_generation(trace, generations, pop, fit, cost, best, final=True)
+    metrics.SOLVER_GENERATIONS.inc(generations)
+    sf = pop[ordena(fit, 1)[0]]
+    log.debug("Solução final: %s", sf)
     
     initial_value = evaluate_array(si, cost)
     final_value = evaluate_array(sf, cost)
-    log.debug(f"Valor da solução inicial: {initial_value}, Valor da solução final: {final_value}")
+    log.debug("Valor da solução inicial: %s, Valor da solução final: %s", initial_value, final_value)
     
-    return si.tolist(), sf.tolist(), float(initial_value), float(final_value)
\ No newline at end of file
+    return si.tolist(), sf.tolist(), float(initial_value), float(final_value)
+
+# ALL METHODS ------------------------------------------------------------------------
+ALL_METHODS = ('slope_climbing', 'slope_climbing_try', 'temperature', 'genetic_algorithm')
+# O AG é bem mais lento que os outros métodos; só roda quando pedido.
+DEFAULT_METHODS = ('slope_climbing', 'slope_climbing_try', 'temperature')
+
+def freeze_state(solutions, current_values, weights, costs, max_weights):
+    """
+    Congela o problema e a solução inicial em arrays somente leitura.
+
+    Todos os métodos partem desse mesmo estado; cada um recebe a sua cópia
+    mutável em thaw_state, então nenhum altera o ponto de partida dos outros.
+
+    :return: Dicionário com tuplas de arrays numpy não graváveis.
+    """
+    def frozen(values, dtype=None):
+        # Sem dtype o numpy mantém pesos e custos inteiros como int e fracionários
+        # como float; só as soluções 0/1 são sempre inteiras.
+        array = np.array(values, dtype=dtype)
+        array.setflags(write=False)
+        return array
+
+    return {
+        'solutions': tuple(frozen(s, int) for s in solutions),
+        'current_values': frozen(current_values, float),
+        'weights': tuple(frozen(w) for w in weights),
+        'costs': tuple(frozen(c) for c in costs),
+        'max_weights': frozen(max_weights),
+    }
+# ------------------------------------------------------------------------------------
+def thaw_state(state):
+    """
+    Cria uma cópia mutável (listas Python) de um estado congelado.
+
+    :param state: Estado devolvido por freeze_state.
+    :return: Tupla (solutions, current_values, weights, costs, max_weights).
+    """
+    return (
+        [s.tolist() for s in state['solutions']],
+        state['current_values'].tolist(),
+        [w.tolist() for w in state['weights']],
+        [c.tolist() for c in state['costs']],
+        state['max_weights'].tolist(),
+    )
+# ------------------------------------------------------------------------------------
+def run_method(method, state, params, cancel=None):
+    """
+    Executa um dos métodos de ALL_METHODS a partir de um estado congelado.
+
+    :param method: Nome do método.
+    :param state: Estado devolvido por freeze_state.
+    :param params: Parâmetros dos métodos (Tmax, temperaturas, configuração do AG).
+    :param cancel: cancellation.Token da requisição (opcional).
+    :return: Dicionário com as soluções e os valores finais de cada mochila.
+    """
+    solutions, current_values, weights, costs, max_weights = thaw_state(state)
+
+    if method == 'slope_climbing':
+        solutions, current_values = slope_climbing(
+            solutions, current_values, weights, costs, max_weights, cancel=cancel
+        )
+    elif method == 'slope_climbing_try':
+        solutions, current_values = slope_climb_try_again(
+            solutions, current_values, weights, costs, max_weights, params['Tmax'], cancel=cancel
+        )
+    elif method == 'temperature':
+        for i in range(len(solutions)):
+            solutions[i], current_values[i] = tempera(
+                solution=solutions[i],
+                weights=weights[i],
+                costs=costs[i],
+                va=current_values[i],
+                max_weight=max_weights[i],
+                ti=params['ti'],
+                tf=params['tf'],
+                fr=params['fr'],
+                cancel=cancel
+            )
+    elif method == 'genetic_algorithm':
+        for i in range(len(solutions)):
+            _, final_solution, _, _ = genetic_algorithm(
+                length=len(weights[i]),
+                weight=weights[i],
+                cost=costs[i],
+                max_weight=max_weights[i],
+                population_size=params['population_size'],
+                generations=params['generations'],
+                cross_over_rate=params['cross_over_rate'],
+                mutation_rate=params['mutation_rate'],
+                keep_individuals_rate=params['keep_individuals_rate'],
+                start_solution=solutions[i],
+                cancel=cancel
+            )
+            solutions[i] = final_solution
+            current_values[i] = evaluate_solution(final_solution, weights[i], costs[i])
+    else:
+        raise ValueError(f"Unknown method '{method}', expected one of {ALL_METHODS}.")
+
+    return {'solutions': solutions, 'current_values': current_values}
+
+# CONVERGENCE TRACE ------------------------------------------------------------------
+def run_traced(fn, fields, capacity, **kwargs):
+    """
+    Executa um solver com um rastro de convergência.
+
+    :param fn: Solver que aceita o parâmetro `trace` (tempera ou genetic_algorithm).
+    :param fields: Campos do rastro (convergence.TEMPERA_FIELDS ou GENETIC_FIELDS).
+    :param capacity: Número máximo de pontos do rastro.
+    :return: Tupla (resultado do solver, rastro em formato de dicionário).
+    """
+    trace = convergence.Trace(fields, capacity)
+    result = fn(trace=trace, **kwargs)
+    return result, trace.to_dict()
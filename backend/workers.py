@@ -0,0 +1,269 @@
+import importlib
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import cancellation
+import incumbents
+import metrics
+
+# Process pool for the CPU-bound solver work, shared by the whole application
+# and created the first time it is needed (or up front by warm_up()).
+#
+# Configuration (environment variables):
+#   SOLVER_WORKERS        worker processes (default: CPU count)
+#   SOLVER_START_METHOD   fork, forkserver or spawn (default: the platform's)
+#   SOLVER_DEADLINE       default per-request deadline in seconds (default: 60)
+#   ROUTE_CONCURRENCY     default concurrent requests per solver route (default: SOLVER_WORKERS)
+#   ROUTE_LIMITS          per-route overrides, e.g. "/calc/knapsack/all=1,/calc/simplex=8"
+#   ROUTE_QUEUE_TIMEOUT   seconds a request may wait for a route slot (default: 1)
+
+# Imported by every worker before its first task. With fork they are imported
+# once in the parent (preload()) and the workers share those pages
+# copy-on-write; with forkserver the server preloads them instead.
+WARM_MODULES = ('numpy', 'scipy.optimize', 'service', 'multi_knapsack')
+
+# How often collect() checks whether the client is still connected, in seconds.
+POLL_INTERVAL = 0.05
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+class Busy(Exception):
+    """Raised when a route is at its concurrency limit."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a solver call does not finish before the request deadline."""
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away while its solver calls are running."""
+
+
+class Deadline:
+    """Absolute point in time after which a request gives up."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+def pool_size() -> int:
+    """Number of solver worker processes (SOLVER_WORKERS, default: CPU count)."""
+    return max(1, int(os.environ.get('SOLVER_WORKERS', os.cpu_count() or 1)))
+
+def default_deadline() -> float:
+    return float(os.environ.get('SOLVER_DEADLINE', 60))
+
+def start_method() -> str:
+    """Start method of the worker processes (SOLVER_START_METHOD)."""
+    return os.environ.get('SOLVER_START_METHOD') or mp.get_start_method()
+
+def preload() -> None:
+    """Import WARM_MODULES in this process."""
+    for name in WARM_MODULES:
+        importlib.import_module(name)
+
+def _context() -> Any:
+    context = mp.get_context(start_method())
+    if context.get_start_method() == 'fork':
+        preload()
+    elif context.get_start_method() == 'forkserver':
+        context.set_forkserver_preload(list(WARM_MODULES))
+    return context
+
+def _init_worker(flags: Any, values: Any) -> None:
+    """Install the shared cancellation flags and incumbent values and import
+    the heavy modules once per worker, before it takes any task."""
+    cancellation.install(flags)
+    incumbents.install(values)
+    preload()
+
+def _ping() -> int:
+    return os.getpid()
+
+def get_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=pool_size(),
+                    mp_context=_context(),
+                    initializer=_init_worker,
+                    initargs=(cancellation.shared_flags(), incumbents.shared_values()),
+                )
+    return _pool
+
+def warm_up() -> None:
+    """Start every worker now so the first requests don't pay for process
+    start-up and the numpy/scipy imports."""
+    pool = get_pool()
+    for future in [pool.submit(_ping) for _ in range(pool_size())]:
+        future.result()
+
+def _discard(pool: ProcessPoolExecutor) -> None:
+    """Drop `pool` if it is still the shared one, so the next call starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown() -> None:
+    """Stop the shared pool, waiting for running tasks."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+def _call(fn: Callable[..., Any], args: Tuple[Any, ...], kwargs: dict) -> Tuple[Any, float, metrics.Snapshot]:
+    """Run `fn` in a worker and return its result, wall time and metric delta."""
+    before = metrics.snapshot()
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    return result, elapsed, metrics.diff(before)
+
+def submit(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """Schedule `fn(*args, **kwargs)` on the pool; read it back with collect().
+
+    A worker that dies (killed, out of memory) breaks the whole pool; the
+    broken pool is replaced by a new one, so only the calls that were running
+    on it fail.
+    """
+    pool = get_pool()
+    try:
+        return pool.submit(_call, fn, args, kwargs)
+    except BrokenProcessPool:
+        _discard(pool)
+        return get_pool().submit(_call, fn, args, kwargs)
+
+def collect(future: Future, deadline: Optional[Deadline] = None,
+            disconnected: Optional[Callable[[], bool]] = None) -> Tuple[Any, float]:
+    """Wait for a submitted call, fold its solver metrics into this process and
+    return `(result, elapsed)`. Raises DeadlineExceeded when `deadline` passes
+    and ClientDisconnected when `disconnected()` turns true (polled every
+    POLL_INTERVAL seconds)."""
+    while True:
+        timeout = deadline.remaining() if deadline else None
+        if disconnected is not None:
+            timeout = POLL_INTERVAL if timeout is None else min(timeout, POLL_INTERVAL)
+        try:
+            result, elapsed, delta = future.result(timeout)
+            break
+        except FutureTimeout:
+            if deadline is not None and deadline.expired():
+                future.cancel()
+                raise DeadlineExceeded(f"Solver did not finish within {deadline.seconds:g}s.")
+            if disconnected is not None and disconnected():
+                future.cancel()
+                raise ClientDisconnected("Client disconnected before the solver finished.")
+    metrics.merge(delta)
+    return result, elapsed
+
+def collect_all(futures: List[Future], deadline: Optional[Deadline] = None,
+                disconnected: Optional[Callable[[], bool]] = None) -> List[Tuple[Any, float]]:
+    """collect() every future in order; on failure the ones not started yet are
+    cancelled so they don't hold workers for a request that already failed."""
+    try:
+        return [collect(future, deadline, disconnected) for future in futures]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+def run(fn: Callable[..., Any], *args: Any, deadline: Optional[Deadline] = None, **kwargs: Any) -> Any:
+    """Run `fn(*args, **kwargs)` on the pool and wait for its result."""
+    result, _ = collect(submit(fn, *args, **kwargs), deadline)
+    return result
+
+def when_done(futures: Iterable[Future], callback: Callable[[], None]) -> None:
+    """Call `callback()` once every future in `futures` has finished (right
+    away if they all have)."""
+    running = [future for future in futures if not future.done()]
+    if not running:
+        callback()
+        return
+    remaining = [len(running)]
+    lock = threading.Lock()
+
+    def finished(_: Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            callback()
+
+    for future in running:
+        future.add_done_callback(finished)
+
+# ROUTE LIMITS -----------------------------------------------------------------------
+def _parse_limits(spec: str) -> Dict[str, int]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        route, _, value = item.rpartition('=')
+        limits[route.strip()] = int(value)
+    return limits
+
+
+class RouteLimiter:
+    """Caps the number of concurrent requests per route with a semaphore each."""
+
+    def __init__(self, default: int, limits: Optional[Dict[str, int]] = None, queue_timeout: float = 1.0):
+        self.default = default
+        self.limits = dict(limits or {})
+        self.queue_timeout = queue_timeout
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, defaults: Optional[Dict[str, int]] = None) -> 'RouteLimiter':
+        """Build a limiter from the environment; `defaults` are per-route limits
+        used when ROUTE_LIMITS doesn't mention the route."""
+        limits = dict(defaults or {})
+        limits.update(_parse_limits(os.environ.get('ROUTE_LIMITS', '')))
+        return cls(
+            default=int(os.environ.get('ROUTE_CONCURRENCY', pool_size())),
+            limits=limits,
+            queue_timeout=float(os.environ.get('ROUTE_QUEUE_TIMEOUT', 1)),
+        )
+
+    def limit(self, route: str) -> int:
+        """Maximum number of concurrent requests admitted on `route`."""
+        return self.limits.get(route, self.default)
+
+    def _semaphore(self, route: str) -> threading.BoundedSemaphore:
+        semaphore = self._semaphores.get(route)
+        if semaphore is None:
+            with self._lock:
+                semaphore = self._semaphores.setdefault(
+                    route, threading.BoundedSemaphore(self.limit(route))
+                )
+        return semaphore
+
+    def acquire(self, route: str) -> None:
+        """Take one of the route's slots, raising Busy if none frees up in time."""
+        if not self._semaphore(route).acquire(timeout=self.queue_timeout):
+            raise Busy(f"Too many concurrent requests for {route}.")
+
+    def release(self, route: str, pending: Iterable[Future] = ()) -> None:
+        """Give the slot back once every future in `pending` has finished.
+
+        A request that gave up on its deadline may leave work running in the
+        pool; holding the slot until that work ends keeps the route from
+        admitting more than the pool can actually run.
+        """
+        when_done(pending, self._semaphore(route).release)
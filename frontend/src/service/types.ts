@@ -55,6 +55,11 @@ export type AllResponseData = {
   slope_climbing: ResponseData;
   slope_climbing_try: ResponseData;
   temperature: ResponseData;
+  genetic_algorithm?: ResponseData;
+  timings: {
+    methods: Record<string, number>;
+    elapsed: number;
+  };
 };
 
 // API Response Types